@@ -1,106 +1,100 @@
 import streamlit as st
-import pandas as pd
-from mplsoccer import VerticalPitch
-import matplotlib.pyplot as plt
-import time
-
-# Colors
-BACK_COLOR = '#2C3E50'
-CLEAN_WHITE = '#FFFFFF'
-NEON_GREEN = '#06D6A0'
+from shot_data import get_shots
+from data_version import CACHED_VERSIONS, get_data_version
+from shot_db import (db_exists, query_summary, query_options, query_shots, query_top_players,
+                     query_facet_values, query_facet_counts)
+from shot_map import COLUMNS as SHOT_MAP_COLUMNS, NEON_GREEN, BRIGHT_PINK, memory_stats
+from render_service import RenderBusy, render_shot_map_png
+from shot_index import ShotIndex
+from top_players import TopPlayers
+from filter_engine import FACET_COLUMNS, FilterEngine, facet_label
+from shot_map_plotly import COLUMNS as INTERACTIVE_MAP_COLUMNS, create_shot_map_figure
+from prerender import load_manifest, manifest_mtime, find_prerendered
+
+# Colors (shot map colors come from shot_map)
 VERMILION = '#F64740'
-BRIGHT_PINK = '#FF6F61'
-
-# Add caching to data loading
-@st.cache_data
-def load_data():
-    return pd.read_csv('concat_files/concat_shots.csv')
-
-# Cache pitch creation
-@st.cache_resource
-def create_pitch():
-    return VerticalPitch(
-        pitch_type='custom',
-        pitch_length=105,
-        pitch_width=68,
-        half=True,
-        line_color=CLEAN_WHITE,
-        linewidth=1,
-        pitch_color=BACK_COLOR,
-        goal_type='box',
-        label=False
-    )
-
-@st.cache_data
-def prepare_options(df, column):
-    """Generic function to prepare display options with counts for any column"""
-    counts = df[column].value_counts()
-    displays = [f"{value} ({count})" for value, count in counts.items()]
-    display_to_value = {f"{value} ({count})": value for value, count in counts.items()}
-    return displays, display_to_value
-
-@st.cache_data
-def prepare_player_options(df, team=None):
-    """Prepare player options, filtered by team if provided"""
-    filtered_df = df[df['teamName'] == team] if team else df
-    return prepare_options(filtered_df, 'playerName')
-
-@st.cache_data
-def prepare_top_players_table(df, shot_type="all", team=None, limit=10):
-    """Unified function for preparing top players table"""
-    filtered_df = df[df['teamName'] == team] if team else df
-
-    if shot_type == "target":
-        filtered_df = filtered_df[filtered_df['isOnTarget'] == True]
-
-    result = filtered_df.groupby(['playerName', 'teamName']).agg(
-        Shots=('playerName', 'size'),
-        xG=('expectedGoals', 'mean')
-    ).reset_index()
-
-    result = result.sort_values('Shots', ascending=False).head(limit)
-    result['xG'] = result['xG'].apply(lambda x: f'{x:.2f}')
-    result.columns = ['Name', 'Team', 'Shots', 'xG']
-
-    return result
-
-def plot_shots_progressive(filtered_df, goal_color, pitch, ax, stage="full"):
-    """Plot shots progressively based on stage"""
-    if stage == "pitch_only":
-        # Just return the empty pitch
-        return
-
-    elif stage == "goals_only":
-        # Plot only goals
-        goals_df = filtered_df[filtered_df['eventType'] == 'Goal']
-        for _, shot in goals_df.iterrows():
-            pitch.scatter(
-                x=shot['x'],
-                y=shot['y'],
-                s=800 * shot['expectedGoals'],
-                color=goal_color,
-                edgecolors=CLEAN_WHITE,
-                linewidth=0.8,
-                alpha=1,
-                zorder=2,
-                ax=ax,
-            )
-
-    elif stage == "full":
-        # Plot all shots
-        for _, shot in filtered_df.iterrows():
-            is_goal = shot['eventType'] == 'Goal'
-            pitch.scatter(
-                x=shot['x'],
-                y=shot['y'],
-                s=800 * shot['expectedGoals'],
-                color=goal_color if is_goal else BACK_COLOR,
-                edgecolors=CLEAN_WHITE,
-                linewidth=0.8,
-                alpha=1 if is_goal else 0.5,
-                zorder=2 if is_goal else 1,
-                ax=ax,
-            )
+
+# Columns used by this page
+COLUMNS = [
+    'teamId', 'teamName', 'playerId', 'playerName', 'keeperId', 'eventType',
+    'isOnTarget', 'isOwnGoal', 'x', 'y', 'expectedGoals', 'min'
+] + FACET_COLUMNS
+
+# Titles of the extra filters
+FACET_TITLES = {
+    'situation': 'Situation',
+    'shotType': 'Shot type',
+    'period': 'Period',
+    'h_a': 'Home/Away',
+    'isFromInsideBox': 'Distance',
+    'matchRound': 'Round',
+}
+
+# Optional SQLite backend (python concat.py --db): filters and rankings run as indexed queries
+USE_DB = db_exists()
+
+# Rendered shot maps kept in memory, one per (data version, shot type, team, player, filters)
+SHOT_MAP_CACHE_SIZE = 256
+
+# Seconds to wait for a free slot in the render queue before giving up
+RENDER_TIMEOUT = 10
+
+# Zero-copy view of the process-wide shots frame shared by all pages and sessions
+def load_data(data_version):
+    return get_shots(data_version, COLUMNS)
+
+def select_map_shots(data_version, on_target, team, player, facets, columns):
+    """Shots of the current selection, with the given columns"""
+    if USE_DB:
+        return query_shots(columns, on_target, team, player, dict(facets))
+    shots, shot_index, engine = load_shot_tables(data_version)
+    positions = shot_index.lookup(on_target, team, player)
+    if facets:
+        positions = engine.positions(dict(facets), base=engine.from_positions(positions))
+    return shots[columns].iloc[positions]
+
+@st.cache_data(max_entries=SHOT_MAP_CACHE_SIZE, show_spinner=False)
+def render_shot_map(data_version, on_target, team=None, player=None, facets=()):
+    """PNG bytes, shot count and goal count of the shot map for a selection"""
+    shots = select_map_shots(data_version, on_target, team, player, facets, SHOT_MAP_COLUMNS)
+    goal_color = BRIGHT_PINK if on_target else NEON_GREEN
+    return render_shot_map_png(shots, goal_color, timeout=RENDER_TIMEOUT), len(shots), int((shots['eventType'] == 'Goal').sum())
+
+@st.cache_data(max_entries=SHOT_MAP_CACHE_SIZE, show_spinner=False)
+def create_interactive_shot_map(data_version, on_target, team=None, player=None, facets=()):
+    """Plotly (WebGL) figure, shot count and goal count of the shot map for a selection"""
+    shots = select_map_shots(data_version, on_target, team, player, facets, INTERACTIVE_MAP_COLUMNS)
+    goal_color = BRIGHT_PINK if on_target else NEON_GREEN
+    return create_shot_map_figure(shots, goal_color), len(shots), int((shots['eventType'] == 'Goal').sum())
+
+# Manifest of the maps pre-rendered by prerender.py, if any. Keyed on the manifest's mtime (None while the
+# pre-render for this version is still running), so a manifest published after the version bump gets picked up
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def load_prerendered(data_version, mtime):
+    return load_manifest(data_version)
+
+# Shots frame with its team/player row positions and option lists and one bitset per filter value,
+# in one entry so the positions always index the rows they were built from (shared by all sessions)
+@st.cache_resource(max_entries=CACHED_VERSIONS)
+def load_shot_tables(data_version):
+    shots = load_data(data_version)
+    return shots, ShotIndex(shots), FilterEngine(shots)
+
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def load_facet_values(data_version):
+    return query_facet_values()
+
+def get_facet_counts(facets, on_target, team, player):
+    """Shots per filter value given the current selection and the filters on the other columns"""
+    if USE_DB:
+        return query_facet_counts(facets, on_target, team, player)
+    _, shot_index, engine = load_shot_tables(data_version)
+    return engine.facet_counts(facets, base=engine.from_positions(shot_index.lookup(on_target, team, player)))
+
+# Player rankings for every shot type and team, shared by all sessions
+@st.cache_resource(max_entries=CACHED_VERSIONS)
+def load_top_players(data_version):
+    return TopPlayers(load_data(data_version))
 
 # Page configuration
 st.set_page_config(
@@ -136,20 +130,27 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Load data once
-df = load_data()
+# Load data once (not needed at all when the SQLite backend is available)
+data_version = get_data_version()
+df, shot_index, engine = (None, None, None) if USE_DB else load_shot_tables(data_version)
 
 # Main title
 st.title('Libertadores 2025 Shot Map')
 
 # General info
-teams = df['teamId'].nunique()
-players = df['playerId'].nunique()
-keepers = df['keeperId'].nunique()
-shots = len(df)
-isOnTarget = len(df[df['isOnTarget'] == True])
-goals = len(df[df['eventType'] == 'Goal'])
-ownGoal = len(df[df['isOwnGoal'] == True])
+if USE_DB:
+    summary = query_summary()
+    teams, players, keepers = summary['teams'], summary['players'], summary['keepers']
+    shots, isOnTarget = summary['shots'], summary['on_target']
+    goals, ownGoal = summary['goals'], summary['own_goals']
+else:
+    teams = df['teamId'].nunique()
+    players = df['playerId'].nunique()
+    keepers = df['keeperId'].nunique()
+    shots = len(df)
+    isOnTarget = len(df[df['isOnTarget'] == True])
+    goals = len(df[df['eventType'] == 'Goal'])
+    ownGoal = len(df[df['isOwnGoal'] == True])
 
 a, b = st.columns(2)
 c, d = st.columns(2)
@@ -170,6 +171,10 @@ st.sidebar.caption(
     "Feel free to send me a message [axel_bol](https://x.com/axel_bol)."
 )
 
+# Memory check for soak tests: open the page with ?debug=memory
+if st.query_params.get('debug') == 'memory':
+    st.sidebar.json(memory_stats())
+
 # Add radio buttons for shot type selection
 shot_type_radio = st.radio(
     "Select shot type:",
@@ -177,19 +182,23 @@ shot_type_radio = st.radio(
     horizontal=True
 )
 
-# Pre-filter data based on selection
-current_data = df[df['isOnTarget'] == True] if shot_type_radio == "Shots On Target" else df
-goal_color = BRIGHT_PINK if shot_type_radio == "Shots On Target" else NEON_GREEN
+on_target = shot_type_radio == "Shots On Target"
 
 # Get team options
-team_display, display_to_team = prepare_options(current_data, 'teamName')
+if USE_DB:
+    team_display, display_to_team = query_options('teamName', on_target)
+else:
+    team_display, display_to_team = shot_index.get_options('teamName', on_target)
 
 # Team selection
 team_display_selected = st.selectbox('Select a team', team_display, index=None, placeholder='Select a team')
 team = display_to_team.get(team_display_selected, None)
 
 # Get player options based on team selection
-player_display, display_to_player = prepare_player_options(current_data, team)
+if USE_DB:
+    player_display, display_to_player = query_options('playerName', on_target, team)
+else:
+    player_display, display_to_player = shot_index.get_options('playerName', on_target, team)
 
 # Player selection - disabled if no team is selected
 if team:
@@ -200,59 +209,62 @@ else:
     st.selectbox('Select a player', [], disabled=True, placeholder='Select a team first')
     player = None
 
-# Filter data based on selections
-filtered_df = current_data
-if team:
-    filtered_df = filtered_df[filtered_df['teamName'] == team]
-if player:
-    filtered_df = filtered_df[filtered_df['playerName'] == player]
-
-# Create plot with progressive loading
-# Create pitch and prepare figure
-fig, ax = plt.subplots(figsize=(10, 10))
-fig.patch.set_facecolor(BACK_COLOR)
-pitch = create_pitch()
-
-# Create placeholder for the plot
-plot_placeholder = st.empty()
-
-# Stage 1: Show empty pitch immediately
-pitch.draw(ax=ax)
-plot_shots_progressive(filtered_df, goal_color, pitch, ax, stage="pitch_only")
-with plot_placeholder.container():
-    st.info("🏟️ Loading pitch...")
-    st.pyplot(fig)
-
-# Small delay to show the pitch loading
-time.sleep(0.5)
-
-# Stage 2: Add goals
-if len(filtered_df[filtered_df['eventType'] == 'Goal']) > 0:
-    # Clear and redraw
-    ax.clear()
-    pitch.draw(ax=ax)
-    plot_shots_progressive(filtered_df, goal_color, pitch, ax, stage="goals_only")
-
-    with plot_placeholder.container():
-        st.info("⚽ Loading goals...")
-        st.pyplot(fig)
-
-    # Small delay
-    time.sleep(0.5)
-
-# Stage 3: Add all shots
-ax.clear()
-pitch.draw(ax=ax)
-plot_shots_progressive(filtered_df, goal_color, pitch, ax, stage="full")
-
-with plot_placeholder.container():
-    if len(filtered_df) > 0:
-        goals_count = len(filtered_df[filtered_df['eventType'] == 'Goal'])
-        total_shots = len(filtered_df)
-        st.success(f"✅ Loaded {total_shots} shots ({goals_count} goals)")
-    else:
-        st.info("🔍 No shots found with current filters")
-    st.pyplot(fig)
+# More filters, with live counts that account for everything else selected
+facet_values = load_facet_values(data_version) if USE_DB else {
+    column: engine.values(column) for column in FACET_COLUMNS
+}
+# The counts in the labels change the widget identity, carry the selection over explicitly,
+# without values the current data no longer has (the multiselect only accepts its options)
+facets = {column: [value for value in st.session_state.get(f"facet_{column}", []) if value in facet_values[column]]
+          for column in FACET_COLUMNS}
+for column, selected in facets.items():
+    st.session_state[f"facet_{column}"] = selected
+facet_counts = get_facet_counts(facets, on_target, team, player)
+with st.expander("More filters", expanded=any(facets.values())):
+    filter_columns = st.columns(2)
+    for idx, column in enumerate(FACET_COLUMNS):
+        counts = facet_counts[column]
+        filter_columns[idx % 2].multiselect(
+            FACET_TITLES[column],
+            facet_values[column],
+            key=f"facet_{column}",
+            format_func=lambda value, counts=counts, column=column:
+                f"{facet_label(column, value)} ({counts.get(value, 0)})",
+            placeholder='All'
+        )
+facets = tuple((column, tuple(st.session_state[f"facet_{column}"]))
+               for column in FACET_COLUMNS if st.session_state[f"facet_{column}"])
+
+# Interactive map: drawn in the browser, only the shot arrays are sent
+interactive = st.toggle("Interactive map", help="Hover over a shot to see the player, xG, minute and situation")
+
+# Shot map: pre-rendered file for the current data if there is one, otherwise rendered (and kept in memory)
+if facets or interactive:
+    prerendered = None
+else:
+    manifest = load_prerendered(data_version, manifest_mtime(data_version))
+    prerendered = find_prerendered(manifest, data_version, on_target, team, player)
+if interactive:
+    shot_map_fig, total_shots, goals_count = create_interactive_shot_map(data_version, on_target, team, player, facets)
+elif prerendered:
+    shot_map_png, total_shots, goals_count = prerendered
+else:
+    with st.spinner("🏟️ Loading shot map..."):
+        try:
+            shot_map_png, total_shots, goals_count = render_shot_map(data_version, on_target, team, player, facets)
+        except RenderBusy:
+            shot_map_png, total_shots, goals_count = None, None, None
+
+if total_shots is None:
+    st.warning("⏳ Lots of fans are loading shot maps right now, please try again in a moment")
+elif total_shots > 0:
+    st.success(f"✅ Loaded {total_shots} shots ({goals_count} goals)")
+else:
+    st.info("🔍 No shots found with current filters")
+if interactive:
+    st.plotly_chart(shot_map_fig, use_container_width=True, config={'displayModeBar': False})
+elif shot_map_png is not None:
+    st.image(shot_map_png, use_container_width=True)
 
 # Add separator
 st.markdown("---")
@@ -264,7 +276,10 @@ if team:
     limit = 5
 
     # Get top players
-    top_overall = prepare_top_players_table(df, shot_type=shot_type_param, limit=limit)
+    if USE_DB:
+        top_overall = query_top_players(shot_type=shot_type_param, limit=limit)
+    else:
+        top_overall = load_top_players(data_version).top(shot_type=shot_type_param, limit=limit)
 
     st.subheader(f"Top {limit} Players Across All Competition by {shot_type_radio}")
 
@@ -304,7 +319,10 @@ st.subheader(f"Top 10 Players by {shot_type_radio}")
 
 # Get top players table based on shot type
 shot_type_param = "target" if shot_type_radio == "Shots On Target" else "all"
-top_players_table = prepare_top_players_table(df, shot_type=shot_type_param, team=team)
+if USE_DB:
+    top_players_table = query_top_players(shot_type=shot_type_param, team=team)
+else:
+    top_players_table = load_top_players(data_version).top(shot_type=shot_type_param, team=team)
 
 # Display table without index
 st.table(top_players_table.reset_index(drop=True))
@@ -1,57 +1,339 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import hashlib
+import argparse
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from shot_store import get_store_path, store_exists, write_shot_store, append_shot_store
+from data_version import bump_data_version
+from shot_db import get_db_path, db_exists, write_shot_db, append_shot_db
+
+# Explicit column types so pandas never has to infer them per file
+SHOT_DTYPES = {
+    'id': 'int64', 'eventType': 'str', 'teamId': 'int64', 'playerId': 'int64', 'playerName': 'str',
+    'x': 'float64', 'y': 'float64', 'min': 'int64', 'minAdded': 'float64',
+    'isBlocked': 'bool', 'isOnTarget': 'bool', 'blockedX': 'float64', 'blockedY': 'float64',
+    'goalCrossedY': 'float64', 'goalCrossedZ': 'float64',
+    'expectedGoals': 'float64', 'expectedGoalsOnTarget': 'float64',
+    'shotType': 'str', 'situation': 'str', 'period': 'str', 'isOwnGoal': 'bool', 'onGoalShot': 'str',
+    'isSavedOffLine': 'bool', 'isFromInsideBox': 'bool', 'keeperId': 'float64',
+    'firstName': 'str', 'lastName': 'str', 'fullName': 'str', 'teamColor': 'str',
+    'matchRound': 'int64', 'teamName': 'str', 'h_a': 'str', 'source_file': 'str'
+}
 
 # Function to get the list of processed files from the output CSV file (if it exists)
 def get_processed_files(output_file):
     try:
-        existing_df = pd.read_csv(output_file)
+        existing_df = pd.read_csv(output_file, usecols=['source_file'])
         return existing_df['source_file'].unique().tolist()  # Assuming 'source_file' column stores the source filenames
     except FileNotFoundError:
         return []
 
-# Function to concatenate new CSV files
-def concatenate_csv_files(folder_path, output_file):
-    processed_files = get_processed_files(output_file)
+# Sidecar manifest next to the output file, e.g. concat_shots.manifest.json
+def get_manifest_path(output_file):
+    return f"{os.path.splitext(output_file)[0]}.manifest.json"
+
+def file_hash(file_path):
+    """sha256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_entry(file_path, rows):
+    """Manifest entry for an ingested per-match CSV"""
+    stat = os.stat(file_path)
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'hash': file_hash(file_path),
+        'rows': rows
+    }
+
+def load_manifest(output_file, folder_path):
+    """Load the manifest, bootstrapping it from the output file the first time"""
+    if not os.path.exists(output_file):
+        # Nothing ingested yet (or the output was deleted), start from scratch
+        return {}
+
+    manifest_path = get_manifest_path(output_file)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+
+    # No manifest yet: trust whatever the output file already contains (one-time full read)
+    manifest = {}
+    for filename in get_processed_files(output_file):
+        file_path = os.path.join(folder_path, filename)
+        if os.path.exists(file_path):
+            manifest[filename] = file_entry(file_path, rows=None)
+    return manifest
+
+def save_manifest(manifest, output_file):
+    """Write the manifest atomically"""
+    manifest_path = get_manifest_path(output_file)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def scan_folder(folder_path, manifest):
+    """Compare the CSV folder against the manifest, returns (new_files, changed_files)"""
+    new_files, changed_files = [], []
+    for entry in sorted(os.scandir(folder_path), key=lambda e: e.name):
+        if not entry.name.endswith('.csv'):
+            continue
+        known = manifest.get(entry.name)
+        if known is None:
+            new_files.append(entry.name)
+            continue
+
+        # Only hash files whose size or mtime moved
+        stat = entry.stat()
+        if stat.st_size == known['size'] and stat.st_mtime == known['mtime']:
+            continue
+        if file_hash(entry.path) != known['hash']:
+            changed_files.append(entry.name)
+        else:
+            # Touched but identical, just refresh the stat fields
+            known['size'], known['mtime'] = stat.st_size, stat.st_mtime
+
+    return new_files, changed_files
+
+def by_mtime(folder_path, filenames):
+    """Oldest written first, so the latest copy of a shot comes last for dedupe_shots"""
+    return sorted(filenames, key=lambda f: (os.path.getmtime(os.path.join(folder_path, f)), f))
+
+def read_match_csv(folder_path, filename):
+    """Read one per-match CSV, returns (filename, df, manifest entry)"""
+    file_path = os.path.join(folder_path, filename)
+    df = pd.read_csv(file_path, dtype=SHOT_DTYPES)
+    df['source_file'] = filename  # Add a column to track the source file name
+    return filename, df, file_entry(file_path, rows=len(df))
+
+def read_match_csvs(folder_path, filenames, workers=1):
+    """Read per-match CSVs, in a process pool when workers > 1"""
+    if workers <= 1 or len(filenames) < 2:
+        return [read_match_csv(folder_path, filename) for filename in filenames]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(filenames) // (workers * 4))
+        return list(pool.map(read_match_csv, [folder_path] * len(filenames), filenames, chunksize=chunksize))
+
+def read_concat_file(output_file):
+    return pd.read_csv(output_file, dtype=SHOT_DTYPES)
+
+def write_csv_atomic(df, output_file, append=False):
+    """Write (or append to) the consolidated CSV through a temp file + rename"""
+    tmp_path = f"{output_file}.tmp"
+    append = append and os.path.exists(output_file)
+    if append:
+        # Byte copy of the current file, no parsing needed
+        shutil.copyfile(output_file, tmp_path)
+    df.to_csv(tmp_path, mode='a' if append else 'w', header=not append, index=False)
+    with open(tmp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_file)
+
+# Sorted array of every shot id in the output, e.g. concat_shots.ids.npz
+def get_ids_path(output_file):
+    return f"{os.path.splitext(output_file)[0]}.ids.npz"
+
+def save_id_index(ids, output_file):
+    """Store the seen shot ids together with the output size they describe"""
+    ids_path = get_ids_path(output_file)
+    tmp_path = f"{ids_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, ids=np.unique(ids), output_size=os.path.getsize(output_file))
+    os.replace(tmp_path, ids_path)
+
+def load_id_index(output_file):
+    """Seen shot ids, or None if the index is missing or out of sync with the output file"""
+    try:
+        with np.load(get_ids_path(output_file)) as data:
+            ids, output_size = data['ids'], int(data['output_size'])
+    except FileNotFoundError:
+        return None
+    if not os.path.exists(output_file) or os.path.getsize(output_file) != output_size:
+        return None
+    return ids
+
+def find_seen(ids, seen_ids):
+    """Boolean mask of ids already in the sorted seen_ids array (O(new rows * log n))"""
+    if len(seen_ids) == 0:
+        return np.zeros(len(ids), dtype=bool)
+    pos = np.searchsorted(seen_ids, ids).clip(max=len(seen_ids) - 1)
+    return seen_ids[pos] == ids
+
+def dedupe_shots(df):
+    """Keep the most recently ingested row for every shot id"""
+    return df.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+
+# Function to concatenate new CSV files, returns True if the consolidated data changed
+def concatenate_csv_files(folder_path, output_file, workers=1, use_db=False):
+    manifest = load_manifest(output_file, folder_path)
+    new_files, changed_files = scan_folder(folder_path, manifest)
+    store_path = get_store_path(output_file)
+    # The SQLite backend is optional: kept up to date once it exists
+    db_path = get_db_path(output_file)
+    use_db = use_db or db_exists(db_path)
     df_list = []
 
-    # Loop through each file in the folder
-    for filename in os.listdir(folder_path):
-        if filename.endswith('.csv') and filename not in processed_files:
-            file_path = os.path.join(folder_path, filename)
-            df = pd.read_csv(file_path)
-            df['source_file'] = filename  # Add a column to track the source file name
-            if not df.empty:  # Ensure the DataFrame is not empty before adding NEW LINE
-                df_list.append(df)
-                print(f"Adding new file: {filename}")
-
-    if not df_list:
+    # Read each new or changed file in the folder
+    for filename, df, entry in read_match_csvs(folder_path, by_mtime(folder_path, new_files + changed_files), workers):
+        manifest[filename] = entry
+        if not df.empty:  # Ensure the DataFrame is not empty before adding NEW LINE
+            df_list.append(df)
+            print(f"{'Re-ingesting changed' if filename in changed_files else 'Adding new'} file: {filename}")
+
+    seen_ids = load_id_index(output_file)
+    if os.path.exists(output_file) and (seen_ids is None or not store_exists(store_path)
+                                        or (use_db and not db_exists(db_path))):
+        # First run, or the last run was interrupted: resync the id index, store and database
+        existing_df = read_concat_file(output_file)
+        seen_ids = np.unique(existing_df['id'].to_numpy())
+        write_shot_store(existing_df, store_path)
+        if use_db:
+            write_shot_db(existing_df, db_path)
+        save_id_index(seen_ids, output_file)
+        bump_data_version(output_file)
+        print(f"Rebuilt id index and columnar store from {output_file}")
+    elif seen_ids is None:
+        seen_ids = np.empty(0, dtype='int64')
+
+    if not df_list and not changed_files:
+        save_manifest(manifest, output_file)
         print("No new files to append.")
-        return
-
-    # Filter out empty DataFrames explicitly (for future compatibility) NEW LINE
-    df_list = [df for df in df_list if not df.empty]
-
-    if df_list: # Ensure df_list still has data after filtering NEW LINE
-        # Concatenate new DataFrames
-        df_new = pd.concat(df_list, ignore_index=True)
-
-        # Append to existing file or create a new one
-        try:
-            # If the file exists, append without the header
-            # df_new.to_csv(output_file, mode='a', header=False, index=False)
-            df_new.to_csv(output_file, mode='a', header=not os.path.exists(output_file), index=False) # Write header only if the file does not exist NEW LINE
-            print(f"Appended new data to {output_file}")
-        except FileNotFoundError:
-            # If the file doesn't exist, create it with the header
-            df_new.to_csv(output_file, index=False)
-            print(f"Created new concatenated file {output_file}")
-    else: # NEW LINE
-        print("No new data to concatenate")
+        return False
 
-if __name__ == '__main__':
+    changed = True
+    df_new = dedupe_shots(pd.concat(df_list, ignore_index=True)) if df_list else None
+
+    # Shots whose id was ingested before: the new copy replaces the old one, as in a rebuild
+    seen = find_seen(df_new['id'].to_numpy(), seen_ids) if df_new is not None else np.zeros(0, dtype=bool)
+
+    if (changed_files or seen.any()) and os.path.exists(output_file):
+        # Changed files and re-ingested shots replace their previous rows, so the output has to be rewritten
+        existing_df = read_concat_file(output_file)
+        existing_df = existing_df[~existing_df['source_file'].isin(changed_files)]
+        df_out = pd.concat([existing_df, df_new], ignore_index=True) if df_new is not None else existing_df
+        df_out = dedupe_shots(df_out)
+        write_csv_atomic(df_out, output_file)
+        write_shot_store(df_out, store_path)
+        if use_db:
+            write_shot_db(df_out, db_path)
+        save_id_index(df_out['id'].to_numpy(), output_file)
+        print(f"Rewrote {output_file} with {len(changed_files)} changed file(s) "
+              f"and {int(seen.sum())} replaced shot(s)")
+    elif df_new is not None:
+        # None of these shot ids was ingested before, so they are appended
+        write_csv_atomic(df_new, output_file, append=True)
+        append_shot_store(df_new, store_path)
+        if use_db:
+            append_shot_db(df_new, db_path)
+        save_id_index(np.concatenate([seen_ids, df_new['id'].to_numpy()]), output_file)
+        print(f"Appended new data to {output_file}")
+    else:
+        changed = False
 
-    folder_path = '/home/axel/Code/Python/axel/streamlit/csv'
-    output_file = '/home/axel/Code/Python/axel/streamlit/concat_files/concat_shots.csv'
+    save_manifest(manifest, output_file)
+    if changed:
+        bump_data_version(output_file)
+    return changed
+
+def rebuild_concat_file(folder_path, output_file, workers=1, use_db=False):
+    """Regenerate the consolidated file, manifest and store from every CSV in one pass"""
+    filenames = by_mtime(folder_path, [f for f in os.listdir(folder_path) if f.endswith('.csv')])
+    manifest = {}
+    df_list = []
+    for filename, df, entry in read_match_csvs(folder_path, filenames, workers):
+        manifest[filename] = entry
+        if not df.empty:
+            df_list.append(df)
+
+    df_out = dedupe_shots(pd.concat(df_list, ignore_index=True))
+    write_csv_atomic(df_out, output_file)
+    write_shot_store(df_out, get_store_path(output_file))
+    if use_db or db_exists(get_db_path(output_file)):
+        write_shot_db(df_out, get_db_path(output_file))
+    save_id_index(df_out['id'].to_numpy(), output_file)
+    save_manifest(manifest, output_file)
+    bump_data_version(output_file)
+    print(f"Rebuilt {output_file} from {len(filenames)} files ({len(df_out)} shots)")
+
+def watch_folder(folder_path, output_file, interval=2.0, settle=1.0, workers=1, use_db=False):
+    """Poll the CSV folder and ingest new or changed files as soon as they appear"""
+    print(f"Watching {folder_path} every {interval}s (Ctrl+C to stop)")
+    try:
+        while True:
+            # Cheap O(files) stat pass, the consolidated file is only touched when needed
+            manifest = load_manifest(output_file, folder_path)
+            stats = {filename: (entry['size'], entry['mtime']) for filename, entry in manifest.items()}
+            new_files, changed_files = scan_folder(folder_path, manifest)
+            refreshed = any((entry['size'], entry['mtime']) != stats[filename] for filename, entry in manifest.items())
+            if os.path.exists(output_file) and (refreshed or not os.path.exists(get_manifest_path(output_file))):
+                # Keep bootstrapped entries and touched-but-identical files, so they are not hashed on every poll
+                save_manifest(manifest, output_file)
+            candidates = new_files + changed_files
+            if candidates:
+                # Give the scraper time to finish writing before reading the files
+                newest = max(os.path.getmtime(os.path.join(folder_path, f)) for f in candidates)
+                if time.time() - newest >= settle:
+                    try:
+                        concatenate_csv_files(folder_path, output_file, workers, use_db)
+                    except Exception as e:
+                        print(f"An error occurred: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+def run_benchmark(folder_path, matches=1000, workers=None):
+    """Time a full rebuild of a synthetic folder with 1 worker vs a process pool"""
+    workers = workers or os.cpu_count()
+    sources = sorted(f for f in os.listdir(folder_path) if f.endswith('.csv'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Synthetic season: real matches under new names, with shot ids offset per copy (as shot_store.make_synthetic)
+        # so dedupe_shots keeps every row and the rebuild really covers that many matches
+        synthetic_folder = os.path.join(tmp, 'csv')
+        os.makedirs(synthetic_folder)
+        match_dfs = [pd.read_csv(os.path.join(folder_path, f), dtype=SHOT_DTYPES) for f in sources]
+        for i in range(matches):
+            df = match_dfs[i % len(sources)]
+            df.assign(id=df['id'] + i * 10 ** 10).to_csv(os.path.join(synthetic_folder, f"match-{i:04d}.csv"), index=False)
+
+        for n in dict.fromkeys([1, workers]):
+            output_file = os.path.join(tmp, f"concat_{n}.csv")
+            start = time.perf_counter()
+            rebuild_concat_file(synthetic_folder, output_file, workers=n)
+            elapsed = time.perf_counter() - start
+            print(f"workers={n}: {elapsed:.2f}s for {matches} matches ({len(read_concat_file(output_file))} shots)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concatenate per-match shot CSVs")
+    parser.add_argument('--folder', default='/home/axel/Code/Python/axel/streamlit/csv')
+    parser.add_argument('--output', default='/home/axel/Code/Python/axel/streamlit/concat_files/concat_shots.csv')
+    parser.add_argument('--workers', type=int, default=1, help="Processes used to read the per-match CSVs")
+    parser.add_argument('--rebuild', action='store_true', help="Regenerate the consolidated file from every CSV")
+    parser.add_argument('--db', action='store_true', help="Also maintain the SQLite query backend")
+    parser.add_argument('--watch', action='store_true', help="Keep running and ingest new files as they appear")
+    parser.add_argument('--interval', type=float, default=2.0, help="Seconds between folder scans in watch mode")
+    parser.add_argument('--bench', type=int, metavar='MATCHES', help="Benchmark a rebuild of a synthetic folder with this many matches")
+    args = parser.parse_args()
 
     # Run the concatenation
-    concatenate_csv_files(folder_path, output_file)
+    if args.bench:
+        run_benchmark(args.folder, args.bench, args.workers if args.workers > 1 else None)
+    elif args.rebuild:
+        rebuild_concat_file(args.folder, args.output, args.workers, args.db)
+    elif args.watch:
+        watch_folder(args.folder, args.output, args.interval, workers=args.workers, use_db=args.db)
+    else:
+        concatenate_csv_files(args.folder, args.output, args.workers, args.db)
@@ -0,0 +1,45 @@
+import json
+import os
+import time
+
+# Published by concat.py every time the consolidated data changes
+VERSION_FILE = 'concat_files/concat_shots.version.json'
+CSV_PATH = 'concat_files/concat_shots.csv'
+
+# Caches of derived artifacts take the data version as a key and keep this many versions,
+# the current one plus the previous one for sessions still finishing a rerun on it
+# (shot_data keeps the same number of shots frames, so a cached version's frame is still there)
+CACHED_VERSIONS = 2
+
+def get_version_path(output_file):
+    """Version file that sits next to a consolidated CSV, e.g. concat_shots.version.json"""
+    return f"{os.path.splitext(output_file)[0]}.version.json"
+
+def read_generation(version_file=VERSION_FILE):
+    """Current ingest generation, 0 if nothing was published yet"""
+    try:
+        with open(version_file, encoding='utf-8') as f:
+            return int(json.load(f)['generation'])
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+def bump_data_version(output_file):
+    """Publish a new data generation for the pages, returns it"""
+    version_file = get_version_path(output_file)
+    generation = read_generation(version_file) + 1
+    tmp_path = f"{version_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generation': generation, 'updated_at': time.time()}, f)
+    os.replace(tmp_path, version_file)
+    return generation
+
+def get_data_version(version_file=VERSION_FILE, csv_path=CSV_PATH):
+    """Cheap token that changes whenever the shots data changes, meant to be used as a cache key"""
+    generation = read_generation(version_file)
+    if generation:
+        return f"gen-{generation}"
+    # Nothing published yet, fall back to the CSV modification time
+    try:
+        return f"mtime-{os.stat(csv_path).st_mtime_ns}"
+    except FileNotFoundError:
+        return "missing"
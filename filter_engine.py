@@ -0,0 +1,116 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Shot attributes the Home page can filter on
+FACET_COLUMNS = ['situation', 'shotType', 'period', 'h_a', 'isFromInsideBox', 'matchRound']
+
+# Display labels of coded values
+FACET_LABELS = {
+    'h_a': {'h': 'Home', 'a': 'Away'},
+    'isFromInsideBox': {True: 'Inside the box', False: 'Outside the box'},
+}
+
+# Bits set in each byte value, for numpy versions without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(bits):
+    """Number of set bits in a uint64 bitset"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum())
+    return int(_BYTE_POPCOUNT[bits.view(np.uint8)].sum())
+
+def to_bitset(mask):
+    """Pack a boolean mask into uint64 words (padded with zero bits)"""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+def facet_label(column, value):
+    return FACET_LABELS.get(column, {}).get(value, value)
+
+class FilterEngine:
+    """One bitset per value of each facet column: any filter combination is a few bitwise ANDs"""
+
+    def __init__(self, df, columns=FACET_COLUMNS):
+        self.size = len(df)
+        self.all = to_bitset(np.ones(self.size, dtype=bool))
+        # column -> {value: bitset}, values in sorted order
+        self.bitsets = {}
+        for column in columns:
+            values = df[column].dropna().unique()
+            self.bitsets[column] = {value: to_bitset((df[column] == value).to_numpy())
+                                    for value in sorted(values.tolist())}
+
+    def values(self, column):
+        return list(self.bitsets[column])
+
+    def from_positions(self, positions):
+        """Bitset of the given row positions, e.g. a ShotIndex lookup"""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return to_bitset(mask)
+
+    def combine(self, filters, base=None, skip=None):
+        """Rows matching every filtered column (any of its selected values), within base"""
+        bits = self.all if base is None else base
+        for column, selected in filters.items():
+            if column == skip or not selected:
+                continue
+            column_bits = np.zeros_like(bits)
+            for value in selected:
+                if value in self.bitsets[column]:
+                    column_bits |= self.bitsets[column][value]
+            bits = bits & column_bits
+        return bits
+
+    def positions(self, filters, base=None):
+        """Sorted row positions of a filter combination"""
+        bits = self.combine(filters, base)
+        return np.flatnonzero(np.unpackbits(bits.view(np.uint8), count=self.size, bitorder='little'))
+
+    def count(self, filters, base=None):
+        return popcount(self.combine(filters, base))
+
+    def facet_counts(self, filters, base=None):
+        """Faceted counts: for each column, shots per value given the filters on all the other columns"""
+        counts = {}
+        for column, value_bits in self.bitsets.items():
+            others = self.combine(filters, base, skip=column)
+            counts[column] = {value: popcount(others & bits) for value, bits in value_bits.items()}
+        return counts
+
+def run_benchmark(csv_path, scales=(1, 10, 100), repeat=200):
+    """Per-interaction cost (filter + faceted counts) as the data grows"""
+    base = pd.read_csv(csv_path, usecols=FACET_COLUMNS)
+    filters = {'situation': ['RegularPlay', 'FastBreak'], 'shotType': ['Header'], 'h_a': ['h']}
+    for scale in scales:
+        df = pd.concat([base] * scale, ignore_index=True)
+        start = time.perf_counter()
+        engine = FilterEngine(df)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            engine.count(filters)
+            engine.facet_counts(filters)
+        bitsets = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(max(1, repeat // 10)):
+            df[df['situation'].isin(filters['situation']) & df['shotType'].isin(filters['shotType'])
+               & df['h_a'].isin(filters['h_a'])]
+        masks = (time.perf_counter() - start) / max(1, repeat // 10)
+        print(f"{len(df):>8} shots: build {build * 1000:7.1f} ms, filter + facets {bitsets * 1000:6.3f} ms "
+              f"(boolean masks, filter only: {masks * 1000:6.3f} ms)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bitset filter engine")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    args = parser.parse_args()
+
+    run_benchmark(args.csv)
@@ -0,0 +1,91 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+def build_home_away_cube(shots):
+    """Shots per team split by h_a and on target, in a single groupby"""
+    return counts_to_cube(shots.groupby(['teamName', 'h_a', 'isOnTarget'], observed=True).size())
+
+def counts_to_cube(counts):
+    """Cube from shot counts indexed by (teamName, h_a, isOnTarget), e.g. shot_db.query_home_away_counts"""
+    cube = counts.unstack(['h_a', 'isOnTarget'], fill_value=0)
+    # Every (h_a, on target) column exists even if the data has none of them
+    columns = pd.MultiIndex.from_product([['h', 'a'], [False, True]], names=['h_a', 'isOnTarget'])
+    return cube.reindex(columns=columns, fill_value=0)
+
+def slice_home_away(cube, on_target=False):
+    """Home ('h') and away ('a') shot counts per team, all shots or on target only"""
+    if on_target:
+        return pd.DataFrame({side: cube[(side, True)] for side in ('h', 'a')})
+    return pd.DataFrame({side: cube[side].sum(axis=1) for side in ('h', 'a')})
+
+def team_extremes(counts):
+    """Teams with most and least shots at home and away, counting only teams that shot there"""
+    stats = {}
+    for side, column in [('home', 'h'), ('away', 'a')]:
+        side_counts = counts[column][counts[column] > 0]
+        stats[side] = {
+            'most': {'team': side_counts.idxmax(), 'count': side_counts.max()},
+            'least': {'team': side_counts.idxmin(), 'count': side_counts.min()},
+        }
+    return stats
+
+def pivot_home_away(counts, is_mobile=False):
+    """Teams by total shots with their home and away counts (top 10 on mobile)"""
+    pivot_df = counts.assign(total=counts['h'] + counts['a'])
+    pivot_df = pivot_df[pivot_df['total'] > 0].sort_values('total', ascending=False, kind='stable')
+    return pivot_df.head(10) if is_mobile else pivot_df
+
+def build_home_away_views(shots):
+    """Team extremes and pivot of both tabs (keyed by on_target), all sliced from one cube"""
+    return cube_to_views(build_home_away_cube(shots))
+
+def cube_to_views(cube):
+    """Team extremes and pivot of both tabs (keyed by on_target) from a home/away cube"""
+    views = {}
+    for on_target in (False, True):
+        counts = slice_home_away(cube, on_target)
+        views[on_target] = {'stats': team_extremes(counts), 'pivot': pivot_home_away(counts)}
+    return views
+
+def previous_tab_stats(shots, on_target):
+    """Previous approach: masks, value_counts and a groupby + pivot per tab (kept for the benchmark)"""
+    if on_target:
+        shots = shots[shots['isOnTarget'] == True]
+    for side in ('h', 'a'):
+        counts = shots[shots['h_a'] == side]['teamName'].value_counts()
+        counts = counts[counts > 0]
+        counts.idxmax(), counts.max(), counts.idxmin(), counts.min()
+    grouped = shots.groupby(['teamName', 'h_a'], observed=True).size().reset_index(name='count')
+    pivot_df = grouped.pivot(index='teamName', columns='h_a', values='count').fillna(0)
+    pivot_df['total'] = pivot_df.sum(axis=1)
+    return pivot_df.sort_values('total', ascending=False)
+
+def run_benchmark(csv_path, scales=(1, 10, 100), repeat=50):
+    """Both tabs' aggregations: previous per-tab passes on every rerun vs the cube built once per data version"""
+    base = pd.read_csv(csv_path, usecols=['teamName', 'h_a', 'isOnTarget'])
+    for scale in scales:
+        shots = pd.concat([base] * scale, ignore_index=True)
+        shots['teamName'] = shots['teamName'].astype('category')
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for on_target in (False, True):
+                previous_tab_stats(shots, on_target)
+        previous = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            build_home_away_views(shots)
+        build = (time.perf_counter() - start) / repeat
+        print(f"{len(shots):>8} shots: previous {previous * 1000:7.2f} ms per rerun, "
+              f"cube + both tabs' views {build * 1000:6.2f} ms once per data version")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the home/away aggregations")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    args = parser.parse_args()
+
+    run_benchmark(args.csv)
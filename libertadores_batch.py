@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import aiohttp
+
+from libertadores_shots_v1 import extract_match_slug, parse_shots_data, save_shots_data
+from next_data import extract_next_data
+from page_cache import CACHE_FOLDER, get_match_id, save_next_data
+
+# Defaults
+OUTPUT_PATH = '/home/axel/Code/Python/axel/streamlit/csv/'
+ROUNDS_FOLDER = 'rounds'
+CONCURRENCY = 8
+RETRIES = 3
+REQUESTS_PER_SECOND = 4.0
+REQUEST_TIMEOUT = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64)'}
+
+def read_match_urls(path):
+    """Read match URLs from a text file, one per line (blank lines and # comments are skipped)"""
+    with open(path, encoding='utf-8') as f:
+        urls = [line.strip() for line in f]
+    # Drop comments and duplicates while keeping the original order
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
+def round_urls_file(round_id, rounds_folder=ROUNDS_FOLDER):
+    """Path of the URL list for a match round, e.g. rounds/round-3.txt"""
+    return os.path.join(rounds_folder, f"round-{round_id}.txt")
+
+class HostRateLimiter:
+    """Space out requests to the same host so we never exceed requests_per_second"""
+
+    def __init__(self, requests_per_second):
+        self.min_interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        if not self.min_interval:
+            return
+        loop = asyncio.get_running_loop()
+        # Reserve the next free slot for this host, then sleep until it comes up
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        await asyncio.sleep(slot - now)
+
+async def fetch_page(session, url, limiter, retries=RETRIES, backoff=0.5):
+    """Fetch the raw page bytes, retrying on connection errors and 429/5xx responses"""
+    host = urlparse(url).netloc
+    for attempt in range(retries + 1):
+        await limiter.wait(host)
+        try:
+            async with session.get(url) as r:
+                r.raise_for_status()
+                return await r.read()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRY_STATUSES or attempt == retries:
+                raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+        # Exponential backoff before the next attempt
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+def process_page(content, output_path, match_slug, cache_folder=None, save_pages=None):
+    """Parse a downloaded page, cache its JSON and write its per-match CSV"""
+    json_fotmob = extract_next_data(content)
+    if save_pages:
+        # Named by match id, rematches share a slug
+        os.makedirs(save_pages, exist_ok=True)
+        with open(os.path.join(save_pages, f"{match_slug}.{get_match_id(json_fotmob)}.html"), 'wb') as f:
+            f.write(content)
+    if cache_folder:
+        save_next_data(json_fotmob, match_slug, cache_folder)
+    df_shots, h_team, a_team = parse_shots_data(json_fotmob)
+    return save_shots_data(df_shots, output_path, match_slug)
+
+async def scrape_match(session, url, output_path, semaphore, limiter, retries=RETRIES, save_pages=None,
+                       cache_folder=CACHE_FOLDER):
+    """Download and process one match, returns the saved CSV path"""
+    match_slug = extract_match_slug(url)
+    if not match_slug:
+        raise ValueError(f"Could not extract match slug from URL: {url}")
+
+    # Only the network part is bounded, parsing runs in a worker thread
+    async with semaphore:
+        content = await fetch_page(session, url, limiter, retries=retries)
+
+    return await asyncio.to_thread(process_page, content, output_path, match_slug, cache_folder, save_pages)
+
+async def scrape_batch(urls, output_path, concurrency=CONCURRENCY, retries=RETRIES,
+                       requests_per_second=REQUESTS_PER_SECOND, save_pages=None, cache_folder=CACHE_FOLDER):
+    """Scrape all match URLs concurrently, returns ({url: csv_path}, {url: error})"""
+    saved, failed = {}, {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(requests_per_second)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async def run(url):
+        try:
+            path = await scrape_match(session, url, output_path, semaphore, limiter, retries, save_pages, cache_folder)
+            return url, path, None
+        except Exception as e:
+            return url, None, e
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+        # Report each match as soon as its CSV is written
+        for task in asyncio.as_completed([run(url) for url in urls]):
+            url, path, error = await task
+            if error is None:
+                saved[url] = path
+                print(f"Data successfully saved to {path}")
+            else:
+                failed[url] = error
+                print(f"Failed to scrape {url}: {error}")
+
+    return saved, failed
+
+class SavedPageHandler(BaseHTTPRequestHandler):
+    """Stand-in for FotMob: serves <pages_dir>/<name>.html for any /matches/<name>/... path"""
+    pages_dir = None
+
+    def do_GET(self):
+        match_slug = extract_match_slug(self.path)
+        page_path = os.path.join(self.pages_dir, f"{match_slug}.html") if match_slug else None
+        if not page_path or not os.path.exists(page_path):
+            self.send_error(404)
+            return
+
+        with open(page_path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_saved_pages(pages_dir, host='127.0.0.1', port=0):
+    """Start a local HTTP server for saved match pages in a background thread"""
+    handler = type('Handler', (SavedPageHandler,), {'pages_dir': pages_dir})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_benchmark(pages_dir, concurrency=CONCURRENCY):
+    """Scrape every saved page through the local server and report matches/second"""
+    server = serve_saved_pages(pages_dir)
+    host, port = server.server_address[:2]
+    # Saved pages are <slug>.<matchId>.html, the whole name stands in for the slug
+    names = sorted(f[:-len('.html')] for f in os.listdir(pages_dir) if f.endswith('.html'))
+    urls = [f"http://{host}:{port}/matches/{name}/bench" for name in names]
+
+    try:
+        # Sequential baseline first, then the concurrent run
+        for workers in dict.fromkeys([1, concurrency]):
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                saved, failed = asyncio.run(scrape_batch(urls, tmp, concurrency=workers, requests_per_second=0,
+                                                         cache_folder=None))
+                elapsed = time.perf_counter() - start
+            print(f"concurrency={workers}: {len(saved)} matches in {elapsed:.2f}s "
+                  f"({len(saved) / elapsed:.1f} matches/s, {len(failed)} failed)")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape a batch of FotMob match pages concurrently")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('urls_file', nargs='?', help="Text file with one match URL per line")
+    source.add_argument('--round', dest='round_id', help=f"Scrape the URLs listed in {ROUNDS_FOLDER}/round-<id>.txt")
+    source.add_argument('--bench', metavar='PAGES_DIR', help="Benchmark against a local server serving saved pages")
+    parser.add_argument('--output', default=OUTPUT_PATH, help="Folder for the per-match CSV files")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="Max requests per second per host (0 = unlimited)")
+    parser.add_argument('--save-pages', help="Also keep the raw HTML of every page in this folder")
+    parser.add_argument('--cache', default=CACHE_FOLDER, help="Raw JSON cache folder")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.bench, concurrency=args.concurrency)
+    else:
+        urls = read_match_urls(args.urls_file or round_urls_file(args.round_id))
+        print(f"Scraping {len(urls)} matches ...")
+        saved, failed = asyncio.run(scrape_batch(
+            urls, args.output, concurrency=args.concurrency, retries=args.retries,
+            requests_per_second=args.rate, save_pages=args.save_pages, cache_folder=args.cache
+        ))
+        print(f"Scraping completed: {len(saved)} saved, {len(failed)} failed")
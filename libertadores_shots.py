@@ -1,16 +1,14 @@
 import requests
-import json
-from bs4 import BeautifulSoup as bs
 import pandas as pd
 import os
+from next_data import extract_next_data
 
 def scrape_shots_data(url, output_filename, output_path):
-    # Make request and parse HTML
+    # Make request
     r = requests.get(url)
-    soup = bs(r.content, 'html.parser')
 
     # Extract JSON data from the script tag
-    json_fotmob = json.loads(soup.find('script', attrs={'id': '__NEXT_DATA__'}).contents[0])
+    json_fotmob = extract_next_data(r.content)
 
     # Create player stats dataframe
     df = pd.DataFrame(json_fotmob['props']['pageProps']['content']['playerStats'])
@@ -1,59 +1,15 @@
 import requests
-import json
-from bs4 import BeautifulSoup as bs
 import pandas as pd
 import os
-import re
-import unicodedata
+import threading
 from urllib.parse import urlparse
 from fuzzywuzzy import fuzz
+from next_data import extract_next_data
+from page_cache import save_next_data
+from team_registry import get_team_registry
 
-def normalize_team_name(name):
-    """Normalize team name by removing accents and standardizing format"""
-    # Convert to lowercase
-    name = name.lower()
-    # Remove accents
-    name = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore').decode('utf-8')
-    # Remove non-alphanumeric characters and standardize spaces
-    name = re.sub(r'[^\w\s]', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
-
-def create_team_mapping(h_team, a_team, known_aliases=None):
-    """Create a mapping dictionary for home and away teams with their possible variations"""
-    if known_aliases is None:
-        known_aliases = {}
-    # Normalize the official team names
-    norm_h = normalize_team_name(h_team)
-    norm_a = normalize_team_name(a_team)
-
-    # Create a mapping with the full names and their normalized versions
-    mapping = {
-        normalize_team_name(h_team): 'h',
-        normalize_team_name(a_team): 'a'
-    }
-
-    # Add known aliases from the dictionary
-    for team_name, aliases in known_aliases.items():
-        if normalize_team_name(team_name) == norm_h:
-            for alias in aliases:
-                mapping[normalize_team_name(alias)] = 'h'
-        elif normalize_team_name(team_name) == norm_a:
-            for alias in aliases:
-                mapping[normalize_team_name(alias)] = 'a'
-
-    return mapping
-
-def match_team_exact(team_name, mapping):
-    """Match team_name to either h_team or a_team based on exact match after normalization"""
-    norm_team = normalize_team_name(team_name)
-
-    # Try exact match
-    if norm_team in mapping:
-        return mapping[norm_team]
-
-    # If no match, return None (to be handled separately)
-    return None
+# The file choice below checks then writes: one writer at a time, so two rematches never pick the same name
+_save_lock = threading.Lock()
 
 def extract_match_slug(url):
     # Parse the URL and extract the match slug (team1-vs-team2)
@@ -81,24 +37,28 @@ def get_unique_filename(output_path, base_filename):
 
     return filename
 
-def scrape_shots_data(url, output_path):
-    # Extract match slug for filename
-    match_slug = extract_match_slug(url)
-    if not match_slug:
-        raise ValueError("Could not extract match slug from URL. Please check the URL format.")
+def find_existing_match_file(output_path, base_filename, shot_ids):
+    """Return an existing CSV for this slug that already holds any of these shot ids, if any"""
+    name, ext = os.path.splitext(base_filename)
+    filename = base_filename
+    counter = 1
 
-    base_filename = f"{match_slug}.csv"
+    while os.path.exists(os.path.join(output_path, filename)):
+        existing_ids = pd.read_csv(os.path.join(output_path, filename), usecols=['id'])['id']
+        if existing_ids.isin(shot_ids).any():
+            return filename
+        filename = f"{name}-{counter}{ext}"
+        counter += 1
 
-    # Generate a unique filename to avoid overwriting existing files
-    output_filename = get_unique_filename(output_path, base_filename)
+    return None
 
-    # Make request and parse HTML
+def fetch_next_data(url):
+    """Download a FotMob match page and return its __NEXT_DATA__ JSON"""
     r = requests.get(url)
-    soup = bs(r.content, 'html.parser')
-
-    # Extract JSON data from the script tag
-    json_fotmob = json.loads(soup.find('script', attrs={'id': '__NEXT_DATA__'}).contents[0])
+    return extract_next_data(r.content)
 
+def parse_shots_data(json_fotmob):
+    """Build the shots dataframe from the __NEXT_DATA__ JSON, returns (df_shots, h_team, a_team)"""
     # Variables to add to DF
     matchRound = int(json_fotmob['props']['pageProps']['general']['matchRound'])
     h_team = json_fotmob['props']['pageProps']['general']['homeTeam']['name']
@@ -123,43 +83,48 @@ def scrape_shots_data(url, output_path):
     # Map team names to shots data
     df_shots['teamName'] = df_shots['playerId'].map(new_df.set_index('player_id')['teamName'])
 
-    # Set up any known team aliases (add more as needed)
-    team_aliases = {
-        # "Terminal": ["Script"],
-        "Botafogo RJ": ["Botafogo", "Botafogo de Futebol e Regatas"],
-        "Club Atletico Penarol": ["Penarol", "Peñarol", "CA Penarol"],
-        "Atletico Nacional": ["Atlético Nacional", "Atletico Nacional Medellin"],
-        "Nacional": ["Club Nacional", "Nacional de Montevideo"],
-        "Talleres": ["Talleres de Córdoba"],
-        "Estudiantes": ["Estudiantes de La Plata"],
-        "Central Cordoba de Santiago": ["Central Córdoba (Santiago del Estero)"],
-        "LDU de Quito": ["LDU Quito"],
-        "Bucaramanga": ["Atlético Bucaramanga"],
-        "Colo Colo": ["Colo-Colo"],
-        "Fortaleza": ["Fortaleza EC"],
-        "Barcelona SC": ["Barcelona de Guayaquil"],
-        # Add more teams and their aliases as needed
-    }
-
-    # Create the mapping dictionary
-    team_mapping = create_team_mapping(h_team, a_team, team_aliases)
-
-    # Apply the exact matching function
-    df_shots['h_a'] = df_shots['teamName'].apply(
-        lambda x: match_team_exact(x, team_mapping) if pd.notna(x) else 'unknown'
-    )
+    # Tag home/away shots using the shared team alias registry
+    df_shots['h_a'] = get_team_registry().tag_home_away(df_shots['teamName'], h_team, a_team)
 
     # Handle any 'unknown' matches (could prompt for manual resolution)
     if 'unknown' in df_shots['h_a'].values:
         print(f"Unmatched team names: {df_shots.loc[df_shots['h_a'] == 'unknown', 'teamName'].unique()}")
         # Could add code here to handle unknowns
 
+    return df_shots, h_team, a_team
+
+def save_shots_data(df_shots, output_path, match_slug):
+    """Write the shots dataframe to a per-match CSV and return its path"""
+    base_filename = f"{match_slug}.csv"
+
     # Ensure the output directory exists
     os.makedirs(output_path, exist_ok=True)
 
-    # Save to CSV
-    full_path = os.path.join(output_path, output_filename)
-    df_shots.to_csv(full_path, index=False)
+    with _save_lock:
+        # A re-scrape of the same match replaces its file instead of creating a -1 copy
+        output_filename = (find_existing_match_file(output_path, base_filename, df_shots['id'])
+                           or get_unique_filename(output_path, base_filename))
+
+        # Save to CSV
+        full_path = os.path.join(output_path, output_filename)
+        df_shots.to_csv(full_path, index=False)
+    return full_path
+
+def scrape_shots_data(url, output_path):
+    # Extract match slug for filename
+    match_slug = extract_match_slug(url)
+    if not match_slug:
+        raise ValueError("Could not extract match slug from URL. Please check the URL format.")
+
+    # Make request and extract the JSON payload
+    json_fotmob = fetch_next_data(url)
+
+    # Keep the raw JSON so the CSV can be rebuilt later without re-downloading
+    save_next_data(json_fotmob, match_slug)
+
+    df_shots, h_team, a_team = parse_shots_data(json_fotmob)
+
+    full_path = save_shots_data(df_shots, output_path, match_slug)
 
     print(f"Data successfully saved to {full_path}")
     print(f"Match slug: {match_slug}")
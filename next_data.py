@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup as bs
+
+NEXT_DATA_MARKER = b'__NEXT_DATA__'
+
+def find_next_data_payload(content):
+    """Locate the <script id="__NEXT_DATA__"> payload in the raw page bytes, returns None if not found"""
+    pos = content.find(NEXT_DATA_MARKER)
+    while pos != -1:
+        # The marker must sit inside an opening <script ... id=...> tag
+        tag_start = content.rfind(b'<script', 0, pos)
+        tag_end = content.find(b'>', pos)
+        if (tag_start != -1 and tag_end != -1
+                and content.find(b'>', tag_start, pos) == -1
+                and content.rfind(b'id=', tag_start, pos) != -1):
+            script_end = content.find(b'</script>', tag_end)
+            if script_end != -1:
+                return content[tag_end + 1:script_end]
+        pos = content.find(NEXT_DATA_MARKER, pos + len(NEXT_DATA_MARKER))
+    return None
+
+def extract_next_data_bs(content):
+    """Extract the __NEXT_DATA__ JSON with a full BeautifulSoup parse"""
+    soup = bs(content, 'html.parser')
+    return json.loads(soup.find('script', attrs={'id': '__NEXT_DATA__'}).contents[0])
+
+def extract_next_data(content):
+    """Extract the __NEXT_DATA__ JSON by scanning the raw bytes, falling back to BeautifulSoup"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    payload = find_next_data_payload(content)
+    if payload is not None:
+        try:
+            return json.loads(payload)
+        except ValueError:
+            pass
+
+    return extract_next_data_bs(content)
+
+def measure(extract, pages):
+    """Mean latency (ms) and peak traced memory (MB) of an extraction function over the pages"""
+    # Time without tracing first, tracemalloc slows allocations down a lot
+    start = time.perf_counter()
+    for content in pages:
+        extract(content)
+    elapsed = time.perf_counter() - start
+
+    peak = 0
+    for content in pages:
+        tracemalloc.start()
+        extract(content)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed / len(pages) * 1000, peak / 1024 ** 2
+
+def run_benchmark(pages_dir):
+    """Compare the byte-scan and BeautifulSoup extraction paths over saved pages"""
+    pages = []
+    for filename in sorted(os.listdir(pages_dir)):
+        if filename.endswith('.html'):
+            with open(os.path.join(pages_dir, filename), 'rb') as f:
+                pages.append(f.read())
+    if not pages:
+        print(f"No saved pages found in {pages_dir}")
+        return
+
+    # Both paths must agree before timing them
+    for content in pages:
+        assert extract_next_data(content) == extract_next_data_bs(content)
+
+    avg_size = sum(len(content) for content in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {avg_size:.0f} KB on average")
+    for name, extract in [('byte scan', extract_next_data), ('BeautifulSoup', extract_next_data_bs)]:
+        latency, peak = measure(extract, pages)
+        print(f"{name:>14}: {latency:8.2f} ms/page, peak memory {peak:7.2f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark __NEXT_DATA__ extraction over saved pages")
+    parser.add_argument('pages_dir', help="Folder of saved match pages (see libertadores_batch.py --save-pages)")
+    args = parser.parse_args()
+
+    run_benchmark(args.pages_dir)
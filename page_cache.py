@@ -0,0 +1,110 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+
+# Defaults
+CACHE_FOLDER = 'cache/pages'
+CSV_FOLDER = '/home/axel/Code/Python/axel/streamlit/csv/'
+CACHE_EXT = '.json.gz'
+
+def content_hash(payload):
+    """Short sha256 of the serialized payload"""
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+def get_match_id(json_fotmob):
+    """FotMob match id of a __NEXT_DATA__ JSON, unlike the slug it is unique per match (rematches included)"""
+    return str(json_fotmob['props']['pageProps']['general']['matchId'])
+
+def cache_path(match_slug, match_id, digest, cache_folder=CACHE_FOLDER):
+    """Cache file for a match and content hash, e.g. bahia-vs-nacional.4803557.3f2a...json.gz"""
+    return os.path.join(cache_folder, f"{match_slug}.{match_id}.{digest}{CACHE_EXT}")
+
+def save_next_data(json_fotmob, match_slug, cache_folder=CACHE_FOLDER):
+    """Store the __NEXT_DATA__ JSON compressed on disk, returns the cache file path"""
+    # Canonical serialization so the same payload always gets the same hash
+    payload = json.dumps(json_fotmob, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    path = cache_path(match_slug, get_match_id(json_fotmob), content_hash(payload), cache_folder)
+
+    if os.path.exists(path):
+        # Same content already cached, just mark it as the latest version
+        os.utime(path)
+        return path
+
+    os.makedirs(cache_folder, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return path
+
+def read_cache_file(path):
+    """Load a cached __NEXT_DATA__ JSON"""
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read())
+
+def list_cached_pages(cache_folder=CACHE_FOLDER):
+    """Map every cached match id to its slug and most recently stored file"""
+    latest = {}
+    if not os.path.isdir(cache_folder):
+        return latest
+
+    for entry in os.scandir(cache_folder):
+        if not entry.name.endswith(CACHE_EXT):
+            continue
+        parts = entry.name[:-len(CACHE_EXT)].split('.')
+        if len(parts) == 3:
+            match_slug, match_id, _ = parts
+        else:
+            # Files cached before the match id was part of the name
+            try:
+                match_slug, match_id = parts[0], get_match_id(read_cache_file(entry.path))
+            except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+                print(f"Skipping unreadable cache file {entry.name}: {e!r}")
+                continue
+        mtime = entry.stat().st_mtime
+        if match_id not in latest or mtime > latest[match_id][0]:
+            latest[match_id] = (mtime, match_slug, entry.path)
+
+    return {match_id: (match_slug, path)
+            for match_id, (_, match_slug, path) in sorted(latest.items(), key=lambda item: (item[1][1], item[0]))}
+
+def load_next_data(match_id, cache_folder=CACHE_FOLDER):
+    """Return the latest cached JSON for a match id, or None if it was never cached"""
+    cached = list_cached_pages(cache_folder).get(str(match_id))
+    return read_cache_file(cached[1]) if cached else None
+
+def reparse_all(cache_folder=CACHE_FOLDER, output_path=CSV_FOLDER):
+    """Rebuild the per-match CSV of every cached match from the cache, without any network access"""
+    from libertadores_shots_v1 import parse_shots_data, save_shots_data
+
+    start = time.perf_counter()
+    rebuilt, failed = [], {}
+    for match_id, (match_slug, path) in list_cached_pages(cache_folder).items():
+        try:
+            df_shots, _, _ = parse_shots_data(read_cache_file(path))
+            # Same file choice as the scraper: the CSV holding these shots, or a new -1 file for a rematch
+            rebuilt.append(save_shots_data(df_shots, output_path, match_slug))
+        except Exception as e:
+            failed[match_id] = e
+            print(f"Failed to reparse {match_slug} ({match_id}): {e}")
+
+    print(f"Rebuilt {len(rebuilt)} CSV files in {time.perf_counter() - start:.2f}s ({len(failed)} failed)")
+    return rebuilt, failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raw FotMob page cache")
+    parser.add_argument('--cache', default=CACHE_FOLDER, help="Cache folder")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="List cached matches")
+    reparse = commands.add_parser('reparse', help="Rebuild every per-match CSV from the cache")
+    reparse.add_argument('--output', default=CSV_FOLDER, help="Folder for the per-match CSV files")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for match_id, (match_slug, path) in list_cached_pages(args.cache).items():
+            print(f"{match_id}\t{match_slug}\t{path}")
+    else:
+        reparse_all(args.cache, args.output)
@@ -1,7 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from streamlit_js_eval import streamlit_js_eval
+from shot_data import get_shots
+from data_version import CACHED_VERSIONS, get_data_version
+from home_away import build_home_away_views, counts_to_cube, cube_to_views
+from shot_db import db_exists, query_home_away_counts
 
 # Constants
 COLORS = {
@@ -12,11 +15,15 @@ COLORS = {
     'BRIGHT_PINK': '#FF6F61'
 }
 
-# Add caching to data loading
-@st.cache_data
-def load_data():
-    """Load and cache the shots data."""
-    return pd.read_csv('concat_files/concat_shots.csv')
+# Columns used by this page
+COLUMNS = ['teamName', 'h_a', 'isOnTarget']
+
+# Optional SQLite backend (python concat.py --db): the counts come from one GROUP BY, no shots frame is loaded
+USE_DB = db_exists()
+
+def load_data(data_version):
+    """Zero-copy view of the shots frame shared by all pages and sessions."""
+    return get_shots(data_version, COLUMNS)
 
 def setup_page_config():
     """Configure the page settings."""
@@ -78,34 +85,12 @@ def setup_sidebar():
         "Feel free to send me a message [axel_bol](https://x.com/axel_bol)."
     )
 
-def get_team_stats(shots):
-    """Calculate team statistics for home and away shots."""
-    # Home teams stats
-    home_teams = shots[shots['h_a'] == 'h']
-    team_counts_h = home_teams['teamName'].value_counts()
-    most_frequent_home_team = team_counts_h.idxmax()
-    count_home_most_shots = team_counts_h.max()
-    least_frequent_home_team = team_counts_h.idxmin()
-    count_home_least_shots = team_counts_h.min()
-
-    # Away teams stats
-    away_teams = shots[shots['h_a'] == 'a']
-    team_counts_a = away_teams['teamName'].value_counts()
-    most_frequent_away_team = team_counts_a.idxmax()
-    count_away_most_shots = team_counts_a.max()
-    least_frequent_away_team = team_counts_a.idxmin()
-    count_away_least_shots = team_counts_a.min()
-
-    return {
-        'home': {
-            'most': {'team': most_frequent_home_team, 'count': count_home_most_shots},
-            'least': {'team': least_frequent_home_team, 'count': count_home_least_shots}
-        },
-        'away': {
-            'most': {'team': most_frequent_away_team, 'count': count_away_most_shots},
-            'least': {'team': least_frequent_away_team, 'count': count_away_least_shots}
-        }
-    }
+@st.cache_resource(max_entries=CACHED_VERSIONS)
+def prepare_home_away(data_version, use_db=False):
+    """Team metrics and pivot tables of both tabs, from a single groupby per data version."""
+    if use_db:
+        return cube_to_views(counts_to_cube(query_home_away_counts()))
+    return build_home_away_views(load_data(data_version))
 
 def display_team_metrics(team_stats):
     """Display team metrics in a 2x2 grid."""
@@ -146,29 +131,6 @@ def display_team_metrics(team_stats):
             border=True
         )
 
-def prepare_pivot_data(shots, is_mobile=False):
-    """Prepare the pivot table data for visualization."""
-    # Group by teamName and h_a
-    grouped = shots.groupby(['teamName', 'h_a']).size().reset_index(name='count')
-
-    # Pivot the data
-    pivot_df = grouped.pivot(index='teamName', columns='h_a', values='count').fillna(0)
-
-    # Ensure 'h' and 'a' columns exist
-    for col in ['h', 'a']:
-        if col not in pivot_df.columns:
-            pivot_df[col] = 0
-
-    # Sort by total count
-    pivot_df['total'] = pivot_df.sum(axis=1)
-    pivot_df = pivot_df.sort_values('total', ascending=False)
-
-    # Limit to top 10 teams on mobile
-    if is_mobile:
-        pivot_df = pivot_df.head(10)
-
-    return pivot_df
-
 def create_stacked_bar_chart(pivot_df, chart_type="shots"):
     """Create a stacked bar chart for home and away shots."""
     teams = pivot_df.index.tolist()
@@ -267,13 +229,30 @@ def prepare_display_dataframe(pivot_df):
 
     return display_df
 
-def create_shots_tab(shots, screen_width):
+@st.cache_data(max_entries=CACHED_VERSIONS * 4)
+def prepare_tab_content(data_version, on_target, is_mobile):
+    """Team metrics, chart and table of a tab, built the first time the tab is opened."""
+    view = prepare_home_away(data_version, USE_DB)[on_target]
+
+    # Top 10 teams on mobile
+    pivot_df = view['pivot'].head(10) if is_mobile else view['pivot']
+
+    fig = create_stacked_bar_chart(pivot_df, chart_type="shots_on_target" if on_target else "shots")
+    display_df = prepare_display_dataframe(pivot_df)
+    if on_target:
+        # Update column names to reflect shots on target
+        display_df = display_df.rename(columns={
+            'Home Shots': 'Home Shots On Target',
+            'Away Shots': 'Away Shots On Target'
+        })
+    return view['stats'], fig, display_df
+
+def create_shots_tab(data_version, screen_width):
     """Create content for the Shots Taken tab."""
     # Check if mobile
     is_mobile = screen_width <= 640
 
-    # Get team statistics
-    team_stats = get_team_stats(shots)
+    team_stats, fig, display_df = prepare_tab_content(data_version, False, is_mobile)
 
     # Display team metrics
     display_team_metrics(team_stats)
@@ -281,12 +260,6 @@ def create_shots_tab(shots, screen_width):
     # Sub header title
     st.subheader("Shot Count per Team (Home vs Away)")
 
-    # Prepare data
-    pivot_df = prepare_pivot_data(shots, is_mobile)
-
-    # Create and display chart with shots type
-    fig = create_stacked_bar_chart(pivot_df, chart_type="shots")
-
     if is_mobile:
         st.info("📱 Top 10 teams with most shots taken Home & Away shown on mobile")
 
@@ -297,20 +270,15 @@ def create_shots_tab(shots, screen_width):
         'displayModeBar': False   # Hide the toolbar completely
     })
 
-    # Prepare and display dataframe
-    display_df = prepare_display_dataframe(pivot_df)
+    # Display dataframe
     st.dataframe(display_df, use_container_width=True, hide_index=True)
 
-def create_shots_on_target_tab(shots, screen_width):
+def create_shots_on_target_tab(data_version, screen_width):
     """Create content for the Shots On Target tab."""
-    # Filter for shots on target only
-    shots_on_target = shots[shots['isOnTarget'] == True]
-
     # Check if mobile
     is_mobile = screen_width <= 640
 
-    # Get team statistics for shots on target
-    team_stats = get_team_stats(shots_on_target)
+    team_stats, fig, display_df = prepare_tab_content(data_version, True, is_mobile)
 
     # Display team metrics
     display_team_metrics(team_stats)
@@ -318,12 +286,6 @@ def create_shots_on_target_tab(shots, screen_width):
     # Sub header title
     st.subheader("Shots On Target per Team (Home vs Away)")
 
-    # Prepare data
-    pivot_df = prepare_pivot_data(shots_on_target, is_mobile)
-
-    # Create and display chart with shots_on_target type
-    fig = create_stacked_bar_chart(pivot_df, chart_type="shots_on_target")
-
     if is_mobile:
         st.info("📱 Top 10 teams with most shots on target Home & Away shown on mobile")
 
@@ -334,13 +296,7 @@ def create_shots_on_target_tab(shots, screen_width):
         'displayModeBar': False   # Hide the toolbar completely
     })
 
-    # Prepare and display dataframe
-    display_df = prepare_display_dataframe(pivot_df)
-    # Update column names to reflect shots on target
-    display_df = display_df.rename(columns={
-        'Home Shots': 'Home Shots On Target',
-        'Away Shots': 'Away Shots On Target'
-    })
+    # Display dataframe
     st.dataframe(display_df, use_container_width=True, hide_index=True)
 
 def create_home_vs_away_tab():
@@ -362,21 +318,20 @@ def main():
     # Setup sidebar
     setup_sidebar()
 
-    # Load data
-    shots = load_data()
-
-    # Create tabs
-    tab1, tab2 = st.tabs(["Shots Taken", "Shots On Target"])
+    # Tab selector: unlike st.tabs, only the selected view is computed and sent to the browser
+    selected_tab = st.radio("View", list(TABS), horizontal=True, key="tab", label_visibility="collapsed")
 
-    # Fill tabs with content
-    with tab1:
-        create_shots_tab(shots, screen_width)
-
-    with tab2:
-        create_shots_on_target_tab(shots, screen_width)
+    # Fill the selected tab, the other one is built when it is opened
+    TABS[selected_tab](get_data_version(), screen_width)
 
     # with tab3:
     #     create_home_vs_away_tab()
 
+# Tabs of the page and the function that fills each one
+TABS = {
+    "Shots Taken": create_shots_tab,
+    "Shots On Target": create_shots_on_target_tab,
+}
+
 if __name__ == "__main__":
     main()
@@ -1,11 +1,15 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
 import base64
+import io
 import os
 from PIL import Image
 from streamlit_js_eval import streamlit_js_eval
+from team_registry import get_team_registry
+from shot_data import get_shots
+from data_version import CACHED_VERSIONS, get_data_version
+from shot_db import db_exists, query_team_totals
 
 # Constants
 LOGOS_FOLDER = 'logos'
@@ -13,6 +17,12 @@ DATA_PATH = 'concat_files/concat_shots.csv'
 DEFAULT_SCREEN_WIDTH = 1000
 MOBILE_BREAKPOINT = 640
 
+# Logos kept encoded in memory (per file and size)
+LOGO_CACHE_SIZE = 128
+
+# Columns used by this page
+COLUMNS = ['id', 'teamName', 'expectedGoals', 'matchRound', 'isOnTarget']
+
 # Sizing configurations
 MOBILE_CONFIG = {
     'width': 400,
@@ -38,10 +48,9 @@ DESKTOP_CONFIG = {
     'annotation_size': 14
 }
 
-@st.cache_data
-def load_data():
-    """Load and cache the shots data."""
-    return pd.read_csv(DATA_PATH)
+def load_data(data_version):
+    """Zero-copy view of the shots frame shared by all pages and sessions."""
+    return get_shots(data_version, COLUMNS, csv_path=DATA_PATH)
 
 def setup_page_config():
     """Configure the page settings."""
@@ -92,38 +101,33 @@ def setup_sidebar():
         "Feel free to send me a message [axel_bol](https://x.com/axel_bol)."
     )
 
-@st.cache_data
-def encode_image(image_path):
-    """Convert image to base64 string for Plotly"""
+# Logos do not depend on the shots data, they are keyed on the file modification time instead
+@st.cache_data(max_entries=LOGO_CACHE_SIZE)
+def encode_image(image_path, size=(40, 40), modified=None):
+    """Resized logo as a base64 PNG data URI for Plotly"""
     try:
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode()
+        with Image.open(image_path) as img:
+            img = img.resize(size, Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format='PNG')
+        encoded_string = base64.b64encode(buffer.getvalue()).decode()
         return f"data:image/png;base64,{encoded_string}"
     except Exception as e:
         st.warning(f"Error encoding image {image_path}: {e}")
         return None
 
-def resize_logo(image_path, size=(40, 40)):
-    """Resize logo to consistent size"""
-    try:
-        with Image.open(image_path) as img:
-            img = img.resize(size, Image.Resampling.LANCZOS)
-            temp_path = image_path.replace('.png', '_resized.png')
-            img.save(temp_path)
-            return temp_path
-    except Exception as e:
-        st.warning(f"Error resizing image {image_path}: {e}")
-        return image_path
-
-@st.cache_data
-def prepare_team_data(shots_df):
-    """Prepare team-level statistics from shots dataframe"""
-    team_stats = shots_df.groupby('teamName').agg({
-        'expectedGoals': 'sum',
-        'id': 'count',
-        'matchRound': 'nunique',
-        'isOnTarget': 'sum'
-    }).reset_index()
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def prepare_team_data(data_version, use_db=False):
+    """Prepare team-level statistics from the shots data (or the SQLite backend)"""
+    if use_db:
+        team_stats = query_team_totals()
+    else:
+        team_stats = load_data(data_version).groupby('teamName', observed=True).agg({
+            'expectedGoals': 'sum',
+            'id': 'count',
+            'matchRound': 'nunique',
+            'isOnTarget': 'sum'
+        }).reset_index()
 
     team_stats.columns = ['team', 'total_xg_conceded', 'total_shots_conceded', 'games_played', 'shots_on_target']
 
@@ -168,13 +172,13 @@ def create_hover_trace(team_stats):
 def create_logo_images(team_stats, logos_path, config):
     """Create logo images for the plot"""
     images = []
+    registry = get_team_registry(logos_folder=logos_path)
     for _, row in team_stats.iterrows():
         team_name = row['team']
-        logo_path = os.path.join(logos_path, f"{team_name}.png")
+        logo_path = registry.logo_path(team_name)
 
-        if os.path.exists(logo_path):
-            resized_path = resize_logo(logo_path, size=config['logo_size'])
-            encoded_image = encode_image(resized_path)
+        if logo_path:
+            encoded_image = encode_image(logo_path, config['logo_size'], os.path.getmtime(logo_path))
 
             if encoded_image:
                 images.append(dict(
@@ -187,13 +191,6 @@ def create_logo_images(team_stats, logos_path, config):
                     xanchor="center", yanchor="middle",
                     layer="above"
                 ))
-
-            # Cleanup temporary file
-            if resized_path != logo_path and os.path.exists(resized_path):
-                try:
-                    os.remove(resized_path)
-                except:
-                    pass
         else:
             st.warning(f"Logo not found for team: {team_name}")
 
@@ -456,10 +453,10 @@ def main():
     setup_sidebar()
 
     try:
-        shots = load_data()
-        st.success(f"✅ Data loaded successfully! {len(shots)} shots analyzed. Hover under a team logo to see details.")
-
-        team_data = prepare_team_data(shots)
+        # With the SQLite backend the aggregation runs inside SQLite, the shots never enter this process
+        team_data = prepare_team_data(get_data_version(csv_path=DATA_PATH), use_db=db_exists())
+        shot_count = int(team_data['total_shots_conceded'].sum())
+        st.success(f"✅ Data loaded successfully! {shot_count} shots analyzed. Hover under a team logo to see details.")
 
         # Display metrics
         # col1, col2, col3 = st.columns(3)
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from data_version import VERSION_FILE, CSV_PATH, get_data_version
+from shot_map import NEON_GREEN, BRIGHT_PINK, render_png, select_shots
+from shot_store import STORE_PATH, read_shots
+
+# Pre-rendered Home shot maps, one folder per data version
+ASSET_FOLDER = 'images/shot_maps'
+MANIFEST_FILE = 'manifest.json'
+COLUMNS = ['teamName', 'playerName', 'isOnTarget', 'x', 'y', 'expectedGoals', 'eventType']
+
+# Shots loaded once per worker process
+_worker_shots = None
+
+def selection_key(on_target, team=None, player=None):
+    """Manifest key of a Home page selection"""
+    return json.dumps([bool(on_target), team, player], ensure_ascii=False)
+
+def list_selections(df):
+    """Every (on_target, team, player) the Home page can show: all teams, each team, each player"""
+    selections = []
+    for on_target in (False, True):
+        shots = df[df['isOnTarget']] if on_target else df
+        selections.append((on_target, None, None))
+        for team, team_shots in shots.groupby('teamName', observed=True):
+            selections.append((on_target, team, None))
+            for player in team_shots['playerName'].dropna().unique():
+                selections.append((on_target, team, player))
+    return selections
+
+def init_worker(store_path, csv_path):
+    global _worker_shots
+    _worker_shots = read_shots(COLUMNS, store_path, csv_path)
+
+def render_selection(args):
+    """Render one selection in a worker, returns its manifest entry"""
+    index, asset_path, (on_target, team, player) = args
+    shots = select_shots(_worker_shots, on_target, team, player)
+    filename = f"{index:05d}.png"
+    with open(os.path.join(asset_path, filename), 'wb') as f:
+        f.write(render_png(shots, BRIGHT_PINK if on_target else NEON_GREEN))
+    return selection_key(on_target, team, player), {
+        'file': filename,
+        'shots': len(shots),
+        'goals': int((shots['eventType'] == 'Goal').sum()),
+    }
+
+def get_asset_path(data_version, asset_folder=ASSET_FOLDER):
+    return os.path.join(asset_folder, data_version)
+
+def get_manifest_path(data_version, asset_folder=ASSET_FOLDER):
+    return os.path.join(get_asset_path(data_version, asset_folder), MANIFEST_FILE)
+
+def manifest_mtime(data_version, asset_folder=ASSET_FOLDER):
+    """Modification time of a version's manifest, None until its pre-render has finished"""
+    try:
+        return os.stat(get_manifest_path(data_version, asset_folder)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def load_manifest(data_version, asset_folder=ASSET_FOLDER):
+    """Manifest of the pre-rendered maps for a data version, {} if there are none"""
+    try:
+        with open(get_manifest_path(data_version, asset_folder), encoding='utf-8') as f:
+            return json.load(f)['images']
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+def find_prerendered(manifest, data_version, on_target, team=None, player=None, asset_folder=ASSET_FOLDER):
+    """(png path, shots, goals) of a pre-rendered selection, None if it was not rendered"""
+    entry = manifest.get(selection_key(on_target, team, player))
+    if entry is None:
+        return None
+    return os.path.join(get_asset_path(data_version, asset_folder), entry['file']), entry['shots'], entry['goals']
+
+def prune_versions(asset_folder, keep):
+    """Remove all but the newest keep version folders"""
+    versions = [os.path.join(asset_folder, name) for name in os.listdir(asset_folder)
+                if os.path.isdir(os.path.join(asset_folder, name)) and not name.endswith('.tmp')]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def prerender_all(asset_folder=ASSET_FOLDER, store_path=STORE_PATH, csv_path=CSV_PATH,
+                  version_file=VERSION_FILE, workers=None, keep=2):
+    """Render every Home selection for the current data version, returns the asset folder"""
+    data_version = get_data_version(version_file, csv_path)
+    asset_path = get_asset_path(data_version, asset_folder)
+    if os.path.exists(os.path.join(asset_path, MANIFEST_FILE)):
+        print(f"{asset_path} is up to date")
+        return asset_path
+
+    selections = list_selections(read_shots(COLUMNS, store_path, csv_path))
+    tmp_path = f"{asset_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    start = time.perf_counter()
+    tasks = [(i, tmp_path, selection) for i, selection in enumerate(selections)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(store_path, csv_path)) as executor:
+        images = dict(executor.map(render_selection, tasks, chunksize=16))
+
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'data_version': data_version, 'created_at': time.time(), 'images': images}, f, ensure_ascii=False)
+
+    if get_data_version(version_file, csv_path) != data_version:
+        # New shots arrived while rendering, these images are already stale
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise RuntimeError(f"Data changed during the pre-render of {data_version}, run it again")
+
+    # Publish the folder in one step, the manifest is only visible once every image is there
+    shutil.rmtree(asset_path, ignore_errors=True)
+    os.replace(tmp_path, asset_path)
+    prune_versions(asset_folder, keep)
+    print(f"Rendered {len(images)} shot maps to {asset_path} in {time.perf_counter() - start:.1f}s")
+    return asset_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render the Home shot map for every team and player")
+    parser.add_argument('--output', default=ASSET_FOLDER, help="Asset folder, one subfolder per data version")
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--version-file', default=VERSION_FILE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--keep', type=int, default=2, help="Data versions to keep in the asset folder")
+    args = parser.parse_args()
+
+    prerender_all(args.output, args.store, args.csv, args.version_file, args.workers, args.keep)
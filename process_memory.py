@@ -0,0 +1,6 @@
+import os
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
@@ -0,0 +1,116 @@
+import argparse
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from shot_map import COLUMNS, NEON_GREEN, make_synthetic_shots, render_png
+
+class RenderBusy(RuntimeError):
+    """Raised when the render queue stays full for longer than the caller is willing to wait"""
+
+def init_worker():
+    # Import fonts and rasterize the pitch before the first real request
+    render_png(make_synthetic_shots(1), NEON_GREEN)
+
+def render_worker(columns, goal_color, stage):
+    return render_png(pd.DataFrame(columns), goal_color, stage)
+
+class RenderService:
+    """Shot-map rendering in a process pool, with at most max_pending renders queued or running"""
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending or self.workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # spawn: forking a process that already runs Streamlit's threads is not safe
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, shots, goal_color, stage="full", timeout=None):
+        """Future of the PNG bytes, blocks while the queue is full (RenderBusy after timeout seconds)"""
+        if not self._slots.acquire(timeout=timeout):
+            raise RenderBusy(f"{self.max_pending} shot maps are already queued")
+        # Plain numpy columns are much cheaper to pickle than a DataFrame
+        columns = {column: shots[column].to_numpy() for column in COLUMNS}
+        try:
+            future = self._executor.submit(render_worker, columns, goal_color, stage)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def render(self, shots, goal_color, stage="full", timeout=None):
+        """PNG bytes of a shot map, rendered in a worker process"""
+        return self.submit(shots, goal_color, stage, timeout).result()
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+@lru_cache(maxsize=None)
+def get_render_service(workers=None, max_pending=None):
+    """Process-wide render service, None on single-core hosts where a pool cannot run renders in parallel"""
+    if (workers or os.cpu_count() or 1) < 2:
+        return None
+    return RenderService(workers, max_pending)
+
+def render_shot_map_png(shots, goal_color, stage="full", timeout=None):
+    """Render through the process pool when there is one, in this thread otherwise"""
+    service = get_render_service()
+    if service is None:
+        return render_png(shots, goal_color, stage)
+    return service.render(shots, goal_color, stage, timeout)
+
+def percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000
+
+def run_load_test(csv_path, concurrency_levels=(1, 8, 32), requests_per_session=8, workers=None, seed=0):
+    """p50/p99 latency of team shot maps for concurrent sessions, in-thread vs process pool"""
+    df = pd.read_csv(csv_path, usecols=COLUMNS + ['teamName'])
+    teams = df.groupby('teamName')
+    team_names = list(teams.groups)
+    service = RenderService(workers)
+    # Wait until every worker is warmed up
+    list(service._executor.map(time.sleep, [0.5] * service.workers))
+    print(f"{service.workers} render workers, queue of {service.max_pending}, {os.cpu_count()} CPUs")
+
+    def session(mode, session_id):
+        rng = random.Random(seed + session_id)
+        latencies = []
+        for _ in range(requests_per_session):
+            shots = teams.get_group(rng.choice(team_names))
+            start = time.perf_counter()
+            if mode == 'thread':
+                render_png(shots, NEON_GREEN)
+            else:
+                service.render(shots, NEON_GREEN)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    for concurrency in concurrency_levels:
+        for mode in ('thread', 'pool'):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as sessions:
+                results = sessions.map(lambda i: session(mode, i), range(concurrency))
+                latencies = [latency for result in results for latency in result]
+            elapsed = time.perf_counter() - start
+            print(f"{concurrency:>3} sessions {mode:>6}: p50 {percentile_ms(latencies, 50):7.0f} ms, "
+                  f"p99 {percentile_ms(latencies, 99):7.0f} ms, {len(latencies) / elapsed:5.1f} maps/s")
+    service.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the shot-map render service")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    parser.add_argument('--concurrency', default='1,8,32', help="Comma separated session counts")
+    parser.add_argument('--requests', type=int, default=8, help="Shot maps per session")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    run_load_test(args.csv, [int(n) for n in args.concurrency.split(',')], args.requests, args.workers)
@@ -0,0 +1,102 @@
+import argparse
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_version import CACHED_VERSIONS, CSV_PATH, VERSION_FILE, get_data_version, get_version_path
+from process_memory import current_rss_mb
+from shot_store import STORE_PATH, read_shots, read_shots_incremental
+
+# Every column any page uses, loaded once per process
+SHARED_COLUMNS = [
+    'id', 'teamId', 'teamName', 'playerId', 'playerName', 'keeperId', 'eventType', 'isOnTarget', 'isOwnGoal',
+    'x', 'y', 'expectedGoals', 'min', 'situation', 'shotType', 'period', 'h_a', 'isFromInsideBox', 'matchRound',
+]
+
+# (store, csv) -> {data version: shots frame}, the last CACHED_VERSIONS versions read, like the derived caches
+_shared = {}
+_shared_lock = threading.Lock()
+
+def read_current(store_path, csv_path):
+    """Data version and shots frame as they are on disk, read again if the data changed meanwhile"""
+    data_version = get_data_version(get_version_path(csv_path), csv_path)
+    while True:
+        shots = read_shots_incremental(SHARED_COLUMNS, store_path, csv_path)
+        read_version = get_data_version(get_version_path(csv_path), csv_path)
+        if read_version == data_version:
+            return data_version, shots
+        data_version = read_version
+
+def get_shots(data_version=None, columns=None, store_path=STORE_PATH, csv_path=CSV_PATH):
+    """The process-wide shots frame for a data version (read-only), or a zero-copy view of some columns"""
+    if data_version is None:
+        data_version = get_data_version(get_version_path(csv_path), csv_path)
+    with _shared_lock:
+        versions = _shared.setdefault((store_path, csv_path), OrderedDict())
+        if data_version not in versions:
+            # Frames are only stored under the version actually read: a stale version gets the current frame
+            data_version, shots = read_current(store_path, csv_path)
+            versions[data_version] = shots
+        versions.move_to_end(data_version)
+        while len(versions) > CACHED_VERSIONS:
+            versions.popitem(last=False)
+        shots = versions[data_version]
+    if columns is None:
+        return shots
+    # Same column arrays as the shared frame, nothing is copied
+    return pd.DataFrame({column: shots[column] for column in columns}, copy=False)
+
+def shares_data(view, shots):
+    """True when every column of view uses the shared frame's memory"""
+    for column in view.columns:
+        values, shared = view[column].array, shots[column].array
+        if isinstance(values, pd.Categorical):
+            values, shared = values.codes, shared.codes
+        if not np.shares_memory(np.asarray(values), np.asarray(shared)):
+            return False
+    return True
+
+def memory_report(csv_path=CSV_PATH, version_file=VERSION_FILE, reruns=10):
+    """Shots memory held by the three pages: per-page st.cache_data copies vs the shared frame"""
+    page_columns = {
+        'Home': ['teamId', 'teamName', 'playerId', 'playerName', 'keeperId', 'eventType', 'isOnTarget',
+                 'isOwnGoal', 'x', 'y', 'expectedGoals', 'min', 'situation', 'shotType', 'period', 'h_a',
+                 'isFromInsideBox', 'matchRound'],
+        'Home vs Away': ['teamName', 'h_a', 'isOnTarget'],
+        'Shot Analysis': ['id', 'teamName', 'expectedGoals', 'matchRound', 'isOnTarget'],
+    }
+
+    def frame_mb(df):
+        return df.memory_usage(deep=True, index=False).sum() / 1024 ** 2
+
+    # Before: each page caches its own frame and st.cache_data hands every rerun a fresh unpickled copy
+    start = current_rss_mb()
+    cached = {page: read_shots(columns, csv_path=csv_path) for page, columns in page_columns.items()}
+    held = sum(frame_mb(df) for df in cached.values())
+    copies = [pickle.loads(pickle.dumps(df)) for df in cached.values() for _ in range(reruns)]
+    print(f"Per-page caches: {len(cached)} cached frames ({held:.2f} MB) "
+          f"+ {len(copies)} rerun copies ({sum(frame_mb(df) for df in copies):.2f} MB), "
+          f"RSS +{current_rss_mb() - start:.1f} MB")
+    del cached, copies
+
+    # After: one frame, pages take views of it
+    data_version = get_data_version(version_file, csv_path)
+    start = current_rss_mb()
+    shots = get_shots(data_version, csv_path=csv_path)
+    views = [get_shots(data_version, columns, csv_path=csv_path)
+             for columns in page_columns.values() for _ in range(reruns)]
+    frames = {id(get_shots(data_version, csv_path=csv_path)) for _ in range(reruns)}
+    print(f"Shared frame:    {len(frames)} frame ({frame_mb(shots):.2f} MB), {len(views)} page views, "
+          f"all sharing its memory: {all(shares_data(view, shots) for view in views)}, "
+          f"RSS +{current_rss_mb() - start:.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory used by the shared shots frame")
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--version-file', default=VERSION_FILE)
+    args = parser.parse_args()
+
+    memory_report(args.csv, args.version_file)
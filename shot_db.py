@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from filter_engine import FACET_COLUMNS
+
+# Optional SQLite copy of concat_shots.csv, built by `python concat.py --db`
+DB_PATH = 'concat_files/concat_shots.sqlite'
+TABLE = 'shots'
+INDEXES = {
+    'idx_shots_team_player': ['teamName', 'playerName'],
+    'idx_shots_player_id': ['playerId'],
+    'idx_shots_match_round': ['matchRound'],
+    'idx_shots_source_file': ['source_file'],
+}
+
+_local = threading.local()
+
+def get_db_path(output_file):
+    """Database that sits next to a consolidated CSV, e.g. concat_shots.sqlite"""
+    return f"{os.path.splitext(output_file)[0]}.sqlite"
+
+def db_exists(db_path=DB_PATH):
+    return os.path.exists(db_path)
+
+def create_indexes(con):
+    for name, columns in INDEXES.items():
+        con.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({', '.join(columns)})")
+
+def write_shot_db(df, db_path=DB_PATH):
+    """Rebuild the database from a shots frame and swap it in atomically"""
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with sqlite3.connect(tmp_path) as con:
+        df.to_sql(TABLE, con, index=False)
+        create_indexes(con)
+    con.close()
+    os.replace(tmp_path, db_path)
+
+def append_shot_db(df, db_path=DB_PATH):
+    """Insert new shots in a single transaction"""
+    if not db_exists(db_path):
+        write_shot_db(df, db_path)
+        return
+    with sqlite3.connect(db_path) as con:
+        df.to_sql(TABLE, con, index=False, if_exists='append')
+    con.close()
+
+def get_connection(db_path=DB_PATH):
+    """Read-only connection for the current thread, reopened if the file was replaced"""
+    inode = os.stat(db_path).st_ino
+    cached = getattr(_local, 'connections', {}).get(db_path)
+    if cached and cached[0] == inode:
+        return cached[1]
+
+    if cached:
+        cached[1].close()
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    _local.connections = {**getattr(_local, 'connections', {}), db_path: (inode, con)}
+    return con
+
+def build_filters(on_target=False, team=None, player=None, facets=None, skip=None):
+    """WHERE clause and parameters for the Home page selections"""
+    # facets maps a column to its selected values (any of them matches), skip leaves one column out
+    clauses, params = [], []
+    if on_target:
+        clauses.append("isOnTarget = 1")
+    if team:
+        clauses.append("teamName = ?")
+        params.append(team)
+    if player:
+        clauses.append("playerName = ?")
+        params.append(player)
+    for column, selected in (facets or {}).items():
+        if column == skip or not selected:
+            continue
+        if column not in FACET_COLUMNS:
+            raise ValueError(f"Unsupported filter column: {column}")
+        clauses.append(f"{column} IN ({', '.join('?' * len(selected))})")
+        params.extend(selected)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+def query(sql, params=(), db_path=DB_PATH):
+    return pd.read_sql_query(sql, get_connection(db_path), params=list(params))
+
+def query_summary(db_path=DB_PATH):
+    """Headline numbers shown at the top of the Home page"""
+    return query(f"""
+        SELECT COUNT(DISTINCT teamId) AS teams, COUNT(DISTINCT playerId) AS players,
+               COUNT(DISTINCT keeperId) AS keepers, COUNT(*) AS shots,
+               SUM(isOnTarget) AS on_target, SUM(eventType = 'Goal') AS goals,
+               SUM(isOwnGoal) AS own_goals
+        FROM {TABLE}
+    """, db_path=db_path).iloc[0].to_dict()
+
+def query_options(column, on_target=False, team=None, db_path=DB_PATH):
+    """Display options with counts, same shape as Home.prepare_options"""
+    if column not in ('teamName', 'playerName'):
+        raise ValueError(f"Unsupported option column: {column}")
+    where, params = build_filters(on_target, team)
+    counts = query(f"""
+        SELECT {column} AS value, COUNT(*) AS count FROM {TABLE} {where}
+        GROUP BY {column} ORDER BY count DESC, value
+    """, params, db_path)
+    displays = [f"{value} ({count})" for value, count in zip(counts['value'], counts['count'])]
+    return displays, dict(zip(displays, counts['value']))
+
+def query_shots(columns, on_target=False, team=None, player=None, facets=None, db_path=DB_PATH):
+    """Shots matching the current selection, using the team/player index"""
+    where, params = build_filters(on_target, team, player, facets)
+    return query(f"SELECT {', '.join(columns)} FROM {TABLE} {where}", params, db_path)
+
+def query_facet_values(db_path=DB_PATH):
+    """Sorted distinct values of each filter column"""
+    return {column: query(f"SELECT DISTINCT {column} AS value FROM {TABLE} WHERE {column} IS NOT NULL "
+                          f"ORDER BY value", db_path=db_path)['value'].tolist()
+            for column in FACET_COLUMNS}
+
+def query_facet_counts(facets, on_target=False, team=None, player=None, db_path=DB_PATH):
+    """Same shape as FilterEngine.facet_counts"""
+    counts = {}
+    for column in FACET_COLUMNS:
+        where, params = build_filters(on_target, team, player, facets, skip=column)
+        result = query(f"SELECT {column} AS value, COUNT(*) AS count FROM {TABLE} {where} GROUP BY {column}",
+                       params, db_path)
+        counts[column] = dict(zip(result['value'], result['count']))
+    return counts
+
+def query_top_players(shot_type="all", team=None, limit=10, db_path=DB_PATH):
+    """Top players table, same shape as Home.prepare_top_players_table"""
+    where, params = build_filters(shot_type == "target", team)
+    result = query(f"""
+        SELECT playerName AS Name, teamName AS Team, COUNT(*) AS Shots, AVG(expectedGoals) AS xG
+        FROM {TABLE} {where}
+        GROUP BY playerName, teamName ORDER BY Shots DESC, Name LIMIT ?
+    """, params + [limit], db_path)
+    result['xG'] = result['xG'].map(lambda x: f'{x:.2f}')
+    return result
+
+def query_home_away_counts(db_path=DB_PATH):
+    """Shots per (teamName, h_a, isOnTarget), same shape as the groupby in home_away.build_home_away_cube"""
+    result = query(f"""
+        SELECT teamName, h_a, isOnTarget, COUNT(*) AS count FROM {TABLE}
+        GROUP BY teamName, h_a, isOnTarget ORDER BY teamName
+    """, db_path=db_path)
+    result['isOnTarget'] = result['isOnTarget'].astype(bool)
+    return result.set_index(['teamName', 'h_a', 'isOnTarget'])['count']
+
+def query_team_totals(db_path=DB_PATH):
+    """Per-team totals used by the Shot Analysis page"""
+    return query(f"""
+        SELECT teamName AS team, SUM(expectedGoals) AS total_xg_conceded, COUNT(id) AS total_shots_conceded,
+               COUNT(DISTINCT matchRound) AS games_played, SUM(isOnTarget) AS shots_on_target
+        FROM {TABLE} GROUP BY teamName ORDER BY teamName
+    """, db_path=db_path)
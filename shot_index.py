@@ -0,0 +1,78 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+EMPTY = np.array([], dtype=np.int64)
+
+def option_list(counts):
+    """Display options with counts, most shots first (ties by name), and the display -> value map"""
+    counts = counts[counts > 0].sort_index().sort_values(ascending=False, kind='stable')
+    displays = [f"{value} ({count})" for value, count in counts.items()]
+    return displays, dict(zip(displays, counts.index))
+
+class ShotIndex:
+    """Row positions of each team and player, per shot type, built once per data version"""
+
+    def __init__(self, df):
+        self.size = len(df)
+        # (on_target, team, player) -> sorted row positions in df
+        self.positions = {}
+        # (on_target, column, team) -> (displays, display_to_value)
+        self.options = {}
+
+        for on_target in (False, True):
+            rows = np.flatnonzero(df['isOnTarget'].to_numpy(dtype=bool)) if on_target else np.arange(len(df))
+            subset = df.iloc[rows]
+            self.positions[(on_target, None, None)] = rows
+
+            teams = subset.groupby('teamName', observed=True).indices
+            for team, team_rows in teams.items():
+                self.positions[(on_target, team, None)] = rows[team_rows]
+            players = subset.groupby(['teamName', 'playerName'], observed=True).indices
+            for (team, player), player_rows in players.items():
+                self.positions[(on_target, team, player)] = rows[player_rows]
+
+            team_counts = pd.Series({team: len(team_rows) for team, team_rows in teams.items()}, dtype=int)
+            self.options[(on_target, 'teamName', None)] = option_list(team_counts)
+            self.options[(on_target, 'playerName', None)] = option_list(subset['playerName'].value_counts())
+            player_counts = pd.Series({key: len(player_rows) for key, player_rows in players.items()}, dtype=int)
+            for team in teams:
+                self.options[(on_target, 'playerName', team)] = option_list(player_counts.loc[team])
+
+    def lookup(self, on_target, team=None, player=None):
+        """Row positions of a selection (a player is always looked up within their team)"""
+        return self.positions.get((bool(on_target), team, player), EMPTY)
+
+    def get_options(self, column, on_target, team=None):
+        """Same shape as Home.prepare_options"""
+        return self.options.get((bool(on_target), column, team), ([], {}))
+
+def run_benchmark(csv_path, repeat=1000):
+    """Per-interaction cost of boolean mask filtering vs index lookups"""
+    df = pd.read_csv(csv_path, usecols=['teamName', 'playerName', 'isOnTarget'])
+    start = time.perf_counter()
+    index = ShotIndex(df)
+    print(f"Index built in {(time.perf_counter() - start) * 1000:.1f} ms ({len(index.positions)} selections)")
+
+    team, player = df.groupby(['teamName', 'playerName']).size().idxmax()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        filtered = df[df['isOnTarget'] == True]
+        filtered = filtered[filtered['teamName'] == team]
+        filtered[filtered['playerName'] == player]
+    print(f"Boolean masks: {(time.perf_counter() - start) / repeat * 1e6:8.1f} us per selection")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        df.iloc[index.lookup(True, team, player)]
+    print(f"Index lookup:  {(time.perf_counter() - start) / repeat * 1e6:8.1f} us per selection")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the team/player shot index")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    args = parser.parse_args()
+
+    run_benchmark(args.csv)
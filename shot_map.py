@@ -0,0 +1,249 @@
+import argparse
+import io
+import os
+import gc
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+from mplsoccer import VerticalPitch
+
+from process_memory import current_rss_mb
+
+# Colors
+BACK_COLOR = '#2C3E50'
+CLEAN_WHITE = '#FFFFFF'
+NEON_GREEN = '#06D6A0'
+BRIGHT_PINK = '#FF6F61'
+
+# Marker area per unit of xG
+XG_SIZE = 800
+
+# Columns needed to draw a shot map
+COLUMNS = ['x', 'y', 'expectedGoals', 'eventType']
+
+# Output size: 10x10 inches at 100 dpi
+FIGSIZE = (10, 10)
+DPI = 100
+
+# The pre-rendered pitch canvas is shared by all sessions of the process
+_canvas_lock = threading.Lock()
+
+# Figures created here that were not garbage collected yet
+_live_figures = weakref.WeakSet()
+
+@lru_cache(maxsize=None)
+def create_pitch():
+    """Half pitch shared by every shot map"""
+    return VerticalPitch(
+        pitch_type='custom',
+        pitch_length=105,
+        pitch_width=68,
+        half=True,
+        line_color=CLEAN_WHITE,
+        linewidth=1,
+        pitch_color=BACK_COLOR,
+        goal_type='box',
+        label=False
+    )
+
+def split_goals(shots):
+    """Boolean goal mask of a shots frame"""
+    return (shots['eventType'] == 'Goal').to_numpy()
+
+def select_shots(df, on_target, team=None, player=None):
+    """Shot map rows of a Home page selection"""
+    mask = df['isOnTarget'] if on_target else pd.Series(True, index=df.index)
+    if team:
+        mask = mask & (df['teamName'] == team)
+    if player:
+        mask = mask & (df['playerName'] == player)
+    return df.loc[mask, COLUMNS]
+
+def plot_shots(shots, goal_color, pitch, ax, stage="full"):
+    """Draw the shots as two scatter collections (non-goals underneath, goals on top), returns them"""
+    artists = []
+    if stage == "pitch_only" or len(shots) == 0:
+        return artists
+
+    x = shots['x'].to_numpy()
+    y = shots['y'].to_numpy()
+    sizes = XG_SIZE * shots['expectedGoals'].to_numpy()
+    is_goal = split_goals(shots)
+
+    if stage == "full" and not is_goal.all():
+        misses = ~is_goal
+        artists.append(pitch.scatter(x[misses], y[misses], s=sizes[misses], color=BACK_COLOR,
+                                     edgecolors=CLEAN_WHITE, linewidth=0.8, alpha=0.5, zorder=1, ax=ax))
+    if is_goal.any():
+        artists.append(pitch.scatter(x[is_goal], y[is_goal], s=sizes[is_goal], color=goal_color,
+                                     edgecolors=CLEAN_WHITE, linewidth=0.8, alpha=1, zorder=2, ax=ax))
+    return artists
+
+def plot_shots_per_shot(shots, goal_color, pitch, ax):
+    """Previous approach, one artist per shot (kept for the benchmark)"""
+    for _, shot in shots.iterrows():
+        is_goal = shot['eventType'] == 'Goal'
+        pitch.scatter(
+            x=shot['x'],
+            y=shot['y'],
+            s=XG_SIZE * shot['expectedGoals'],
+            color=goal_color if is_goal else BACK_COLOR,
+            edgecolors=CLEAN_WHITE,
+            linewidth=0.8,
+            alpha=1 if is_goal else 0.5,
+            zorder=2 if is_goal else 1,
+            ax=ax,
+        )
+
+def create_figure(dpi=DPI):
+    """Off-screen figure, never registered with pyplot so it cannot pile up in its figure manager"""
+    fig = Figure(figsize=FIGSIZE, dpi=dpi, facecolor=BACK_COLOR)
+    FigureCanvasAgg(fig)
+    _live_figures.add(fig)
+    return fig, fig.add_subplot()
+
+@contextmanager
+def shot_figure(dpi=DPI):
+    """Figure and axes for one render, cleared on exit so nothing outlives the request"""
+    fig, ax = create_figure(dpi)
+    try:
+        yield fig, ax
+    finally:
+        fig.clear()
+
+@lru_cache(maxsize=None)
+def pitch_canvas(dpi=DPI):
+    """Off-screen figure with the pitch rasterized once, plus a copy of its pixels to restore"""
+    fig, ax = create_figure(dpi)
+    create_pitch().draw(ax=ax)
+    fig.canvas.draw()
+    return fig, ax, fig.canvas.copy_from_bbox(fig.bbox)
+
+def figure_to_png(fig, dpi=DPI):
+    """PNG bytes of a figure"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+def memory_stats():
+    """Live figure counts and resident memory, to check that rendering does not leak"""
+    return {
+        'live_figures': len(_live_figures),
+        'pyplot_figures': len(plt.get_fignums()),
+        'rss_mb': round(current_rss_mb(), 1),
+    }
+
+def make_synthetic_shots(n, seed=0):
+    """Random shots on the attacking half, about 10% goals"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'x': rng.uniform(52.5, 105, n),
+        'y': rng.uniform(0, 68, n),
+        'expectedGoals': rng.uniform(0.01, 0.8, n),
+        'eventType': np.where(rng.random(n) < 0.1, 'Goal', 'Miss'),
+    })
+
+def render_pixels(shots, goal_color, stage="full", dpi=DPI):
+    """RGBA pixels of a shot map: the pre-rendered pitch with only the shot layer drawn on top"""
+    with _canvas_lock:
+        fig, ax, background = pitch_canvas(dpi)
+        fig.canvas.restore_region(background)
+        artists = plot_shots(shots, goal_color, create_pitch(), ax, stage)
+        for artist in artists:
+            ax.draw_artist(artist)
+        pixels = np.array(fig.canvas.buffer_rgba())
+        for artist in artists:
+            artist.remove()
+    return pixels
+
+def render_png(shots, goal_color, stage="full", dpi=DPI):
+    """PNG bytes of a shot map drawn on the pre-rendered pitch"""
+    buffer = io.BytesIO()
+    mpimg.imsave(buffer, render_pixels(shots, goal_color, stage, dpi), format='png', dpi=dpi)
+    return buffer.getvalue()
+
+def render_png_redrawn(shots, goal_color, stage="full", per_shot=False):
+    """Previous approach, a new figure with the pitch drawn again (kept for the benchmark)"""
+    with shot_figure() as (fig, ax):
+        pitch = create_pitch()
+        pitch.draw(ax=ax)
+        if per_shot:
+            plot_shots_per_shot(shots, goal_color, pitch, ax)
+        else:
+            plot_shots(shots, goal_color, pitch, ax, stage)
+        return figure_to_png(fig)
+
+def run_benchmark(sizes=(100, 2500, 50000), per_shot_limit=2500, repeat=3):
+    """Render time of the blitted, redrawn and per-shot shot maps (plot + PNG encode unless noted)"""
+    # Warm up fonts and the pre-rendered pitch
+    render_png(make_synthetic_shots(10), NEON_GREEN)
+    render_png_redrawn(make_synthetic_shots(10), NEON_GREEN)
+    for n in sizes:
+        shots = make_synthetic_shots(n)
+        modes = [
+            ('blit only', lambda: render_pixels(shots, NEON_GREEN)),
+            ('blitted', lambda: render_png(shots, NEON_GREEN)),
+            ('redrawn', lambda: render_png_redrawn(shots, NEON_GREEN)),
+            ('3 stages', lambda: [render_png(shots, NEON_GREEN, stage)
+                                  for stage in ('pitch_only', 'goals_only', 'full')]),
+        ]
+        if n <= per_shot_limit:
+            modes.append(('per-shot', lambda: render_png_redrawn(shots, NEON_GREEN, per_shot=True)))
+        for name, render in modes:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                render()
+                timings.append(time.perf_counter() - start)
+            print(f"{n:>6} shots {name:>9}: {min(timings) * 1000:9.1f} ms")
+        if n > per_shot_limit:
+            print(f"{n:>6} shots  per-shot: skipped (--per-shot-limit {per_shot_limit})")
+
+def run_soak(csv_path, renders=2000, report_every=200, seed=0):
+    """Render random team/player selections and report memory, which should stay flat"""
+    df = pd.read_csv(csv_path, usecols=COLUMNS + ['teamName', 'playerName', 'isOnTarget'])
+    selections = df[['teamName', 'playerName']].drop_duplicates().values.tolist()
+    rng = random.Random(seed)
+    print(f"{0:>6} renders: {memory_stats()}")
+    for i in range(1, renders + 1):
+        team, player = rng.choice(selections)
+        shots = df[df['teamName'] == team]
+        if rng.random() < 0.5:
+            shots = shots[shots['playerName'] == player]
+        if i % 2:
+            render_png(shots, NEON_GREEN)
+        else:
+            render_png_redrawn(shots, BRIGHT_PINK)
+        if i % report_every == 0:
+            gc.collect()
+            print(f"{i:>6} renders: {memory_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shot map rendering benchmark")
+    parser.add_argument('--sizes', default='100,2500,50000', help="Comma separated shot counts")
+    parser.add_argument('--per-shot-limit', type=int, default=2500,
+                        help="Largest size to also render with one artist per shot")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Also save a rendered map of the real data to this PNG")
+    parser.add_argument('--soak', type=int, metavar='RENDERS',
+                        help="Instead of the benchmark, render this many maps and report memory")
+    args = parser.parse_args()
+
+    if args.soak:
+        run_soak(os.path.join('concat_files', 'concat_shots.csv'), args.soak)
+    else:
+        run_benchmark([int(n) for n in args.sizes.split(',')], args.per_shot_limit, args.repeat)
+    if args.output:
+        shots = pd.read_csv(os.path.join('concat_files', 'concat_shots.csv'), usecols=COLUMNS)
+        with open(args.output, 'wb') as f:
+            f.write(render_png(shots, NEON_GREEN))
@@ -0,0 +1,101 @@
+import argparse
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from shot_map import BACK_COLOR, CLEAN_WHITE, NEON_GREEN, XG_SIZE, create_pitch, make_synthetic_shots, render_png
+
+# Columns needed to draw the interactive shot map (with hover details)
+COLUMNS = ['x', 'y', 'expectedGoals', 'eventType', 'playerName', 'min', 'situation']
+
+# Same axis limits as the mplsoccer half pitch (the width axis runs right to left)
+X_RANGE = [72, -4]
+Y_RANGE = [48.5, 109]
+
+def arc_path(center_x, center_y, radius, keep=lambda x, y: True, points=60):
+    """SVG path through the points of a circle that pass the keep test"""
+    angles = np.linspace(0, 2 * np.pi, points * 4 + 1)
+    xs = center_x + radius * np.cos(angles)
+    ys = center_y + radius * np.sin(angles)
+    inside = [(x, y) for x, y in zip(xs, ys) if keep(x, y)]
+    return 'M ' + ' L '.join(f"{x:.2f},{y:.2f}" for x, y in inside)
+
+def pitch_shapes():
+    """Half pitch lines as Plotly shapes, using the mplsoccer pitch dimensions"""
+    dim = create_pitch().dim
+    line = dict(color=CLEAN_WHITE, width=1)
+    middle = dim.center_width
+
+    def box(width, start, end):
+        return dict(type='rect', x0=middle - width / 2, x1=middle + width / 2, y0=start, y1=end, line=line)
+
+    return [
+        dict(type='rect', x0=dim.bottom, x1=dim.top, y0=dim.center_length, y1=dim.right, line=line),
+        box(dim.penalty_area_width, dim.penalty_area_right, dim.right),
+        box(dim.six_yard_width, dim.six_yard_right, dim.right),
+        box(dim.goal_width, dim.right, dim.right + dim.goal_length),
+        dict(type='circle', x0=middle - 0.25, x1=middle + 0.25, y0=dim.penalty_right - 0.25,
+             y1=dim.penalty_right + 0.25, fillcolor=CLEAN_WHITE, line=line),
+        dict(type='path', line=line, path=arc_path(middle, dim.center_length, dim.circle_diameter / 2,
+                                                    keep=lambda x, y: y >= dim.center_length)),
+        dict(type='path', line=line, path=arc_path(middle, dim.penalty_right, dim.circle_diameter / 2,
+                                                    keep=lambda x, y: y <= dim.penalty_area_right)),
+    ]
+
+def shot_trace(shots, color, opacity, name):
+    """One Scattergl trace: width on the horizontal axis, length on the vertical one, as in mplsoccer"""
+    # float32 arrays are shipped as compact base64 buffers
+    sizes = np.sqrt(XG_SIZE * shots['expectedGoals'].fillna(0).to_numpy(dtype='float32'))
+    return go.Scattergl(
+        x=shots['y'].to_numpy(dtype='float32'), y=shots['x'].to_numpy(dtype='float32'),
+        mode='markers', name=name,
+        marker=dict(size=sizes, color=color, opacity=opacity, line=dict(color=CLEAN_WHITE, width=0.8)),
+        customdata=np.column_stack([shots['playerName'].astype(str), shots['min'], shots['situation'].astype(str)]),
+        text=shots['expectedGoals'].astype('float64').round(2),
+        hovertemplate="<b>%{customdata[0]}</b><br>xG: %{text}<br>Minute: %{customdata[1]}'"
+                      "<br>%{customdata[2]}<extra></extra>",
+    )
+
+def create_shot_map_figure(shots, goal_color, height=700):
+    """Interactive half pitch shot map, drawn by the browser (WebGL)"""
+    is_goal = (shots['eventType'] == 'Goal').to_numpy()
+    fig = go.Figure([
+        shot_trace(shots[~is_goal], BACK_COLOR, 0.5, 'Shots'),
+        shot_trace(shots[is_goal], goal_color, 1, 'Goals'),
+    ])
+    fig.update_layout(
+        shapes=pitch_shapes(), showlegend=False, height=height,
+        margin=dict(l=0, r=0, t=0, b=0), paper_bgcolor=BACK_COLOR, plot_bgcolor=BACK_COLOR,
+        xaxis=dict(range=X_RANGE, visible=False, fixedrange=True),
+        yaxis=dict(range=Y_RANGE, visible=False, fixedrange=True, scaleanchor='x'),
+    )
+    return fig
+
+def run_benchmark(sizes=(100, 2500, 50000), repeat=3):
+    """Server CPU time and payload bytes of the PNG shot map vs the Plotly figure JSON"""
+    warmup = make_synthetic_shots(10).assign(playerName='Player', min=45, situation='RegularPlay')
+    render_png(warmup, NEON_GREEN)
+    pio.to_json(create_shot_map_figure(warmup, NEON_GREEN))
+    for n in sizes:
+        shots = make_synthetic_shots(n).assign(playerName='Player Name', min=45, situation='RegularPlay')
+        modes = [
+            ('matplotlib png', lambda: render_png(shots, NEON_GREEN)),
+            ('plotly json', lambda: pio.to_json(create_shot_map_figure(shots, NEON_GREEN)).encode()),
+        ]
+        for name, render in modes:
+            timings = []
+            for _ in range(repeat):
+                start = time.process_time()
+                payload = render()
+                timings.append(time.process_time() - start)
+            print(f"{n:>6} shots {name:>15}: {min(timings) * 1000:8.1f} ms CPU, {len(payload) / 1024:8.1f} KB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the matplotlib and Plotly shot maps")
+    parser.add_argument('--sizes', default='100,2500,50000', help="Comma separated shot counts")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    run_benchmark([int(n) for n in args.sizes.split(',')], args.repeat)
@@ -0,0 +1,128 @@
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+# onGoalShot is scraped as a Python repr string: "{'x': ..., 'y': ..., 'zoomRatio': ...}"
+ON_GOAL_COLUMNS = {'x': 'onGoalShotX', 'y': 'onGoalShotY', 'zoomRatio': 'onGoalShotZoomRatio'}
+
+# Repeated labels, stored once per value
+CATEGORY_COLUMNS = ['teamName', 'playerName', 'shotType', 'situation', 'period', 'eventType']
+# Pitch and goal-mouth coordinates, float32 is plenty for plotting
+FLOAT32_COLUMNS = ['x', 'y', 'blockedX', 'blockedY', 'goalCrossedY', 'goalCrossedZ'] + list(ON_GOAL_COLUMNS.values())
+BOOL_COLUMNS = ['isBlocked', 'isOnTarget', 'isOwnGoal', 'isSavedOffLine', 'isFromInsideBox']
+
+# Fixed columnar schema of the shot store (onGoalShot is replaced by its parsed columns)
+SHOT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('eventType', pa.dictionary(pa.int32(), pa.string())),
+    ('teamId', pa.int64()),
+    ('playerId', pa.int64()),
+    ('playerName', pa.dictionary(pa.int32(), pa.string())),
+    ('x', pa.float32()),
+    ('y', pa.float32()),
+    ('min', pa.int64()),
+    ('minAdded', pa.float64()),
+    ('isBlocked', pa.bool_()),
+    ('isOnTarget', pa.bool_()),
+    ('blockedX', pa.float32()),
+    ('blockedY', pa.float32()),
+    ('goalCrossedY', pa.float32()),
+    ('goalCrossedZ', pa.float32()),
+    ('expectedGoals', pa.float64()),
+    ('expectedGoalsOnTarget', pa.float64()),
+    ('shotType', pa.dictionary(pa.int32(), pa.string())),
+    ('situation', pa.dictionary(pa.int32(), pa.string())),
+    ('period', pa.dictionary(pa.int32(), pa.string())),
+    ('isOwnGoal', pa.bool_()),
+    ('onGoalShotX', pa.float32()),
+    ('onGoalShotY', pa.float32()),
+    ('onGoalShotZoomRatio', pa.float32()),
+    ('isSavedOffLine', pa.bool_()),
+    ('isFromInsideBox', pa.bool_()),
+    ('keeperId', pa.float64()),
+    ('firstName', pa.string()),
+    ('lastName', pa.string()),
+    ('fullName', pa.string()),
+    ('teamColor', pa.string()),
+    ('matchRound', pa.int64()),
+    ('teamName', pa.dictionary(pa.int32(), pa.string())),
+    ('h_a', pa.string()),
+    ('source_file', pa.string()),
+])
+
+def parse_on_goal_shot(on_goal_shot):
+    """Vectorized parse of the onGoalShot repr strings into float32 columns"""
+    parsed = pd.DataFrame(index=on_goal_shot.index)
+    text = on_goal_shot.astype('string')
+    for key, column in ON_GOAL_COLUMNS.items():
+        parsed[column] = pd.to_numeric(text.str.extract(rf"'{key}':\s*([-\d.eE+]+)", expand=False),
+                                       errors='coerce').astype('float32')
+    return parsed
+
+def source_columns(columns):
+    """CSV columns needed to produce the requested typed columns"""
+    if columns is None:
+        return None
+    needed = [c for c in columns if c not in ON_GOAL_COLUMNS.values()]
+    if len(needed) < len(columns) and 'onGoalShot' not in needed:
+        needed.append('onGoalShot')
+    return needed
+
+def apply_shot_schema(df):
+    """Typed, compact copy of a shots frame: parsed onGoalShot, categoricals, float32, bools"""
+    df = df.copy()
+    if 'onGoalShot' in df.columns:
+        df = pd.concat([df.drop(columns='onGoalShot'), parse_on_goal_shot(df['onGoalShot'])], axis=1)
+
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('float32')
+    for column in BOOL_COLUMNS:
+        if column in df.columns and df[column].dtype != bool:
+            df[column] = df[column].map({True: True, False: False, 'True': True, 'False': False}).fillna(False).astype(bool)
+    return df
+
+def concat_shots(frames):
+    """Concatenate typed frames, keeping categoricals (pandas falls back to object otherwise)"""
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+    return df
+
+def to_shot_table(df):
+    """Arrow table with the fixed SHOT_SCHEMA (unknown columns are left out, missing ones are null)"""
+    df = apply_shot_schema(df)
+    columns = []
+    for field in SHOT_SCHEMA:
+        if field.name in df.columns:
+            columns.append(pa.array(df[field.name], from_pandas=True).cast(field.type))
+        else:
+            columns.append(pa.nulls(len(df), field.type))
+    return pa.Table.from_arrays(columns, schema=SHOT_SCHEMA)
+
+def memory_report(csv_path):
+    """Per-process footprint of the shots frame as loaded today vs with the typed schema"""
+    raw = pd.read_csv(csv_path)
+    typed = apply_shot_schema(raw)
+
+    raw_usage = raw.memory_usage(deep=True, index=False)
+    typed_usage = typed.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'raw_kb': raw_usage / 1024, 'typed_kb': typed_usage / 1024})
+    report = report.fillna(0).sort_values('raw_kb', ascending=False)
+
+    print(report.round(1).to_string())
+    print(f"\nTotal: {raw_usage.sum() / 1024 ** 2:.2f} MB -> {typed_usage.sum() / 1024 ** 2:.2f} MB "
+          f"({len(raw)} shots, {typed_usage.sum() / raw_usage.sum():.0%} of the original)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory report for the typed shot schema")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    args = parser.parse_args()
+
+    memory_report(args.csv)
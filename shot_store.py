@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from process_memory import current_rss_mb
+from shot_schema import SHOT_SCHEMA, apply_shot_schema, concat_shots, source_columns, to_shot_table
+
+# Columnar copy of concat_shots.csv, one hive partition per match round
+STORE_PATH = 'concat_files/concat_shots.parquet'
+CSV_PATH = 'concat_files/concat_shots.csv'
+PARTITION_COLUMN = 'matchRound'
+
+# Frames already loaded in this process, keyed by (store, columns): (part files, frame)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def get_store_path(output_file):
+    """Store that sits next to a consolidated CSV, e.g. concat_shots.parquet"""
+    return f"{os.path.splitext(output_file)[0]}.parquet"
+
+def store_exists(store_path=STORE_PATH):
+    return os.path.isdir(store_path)
+
+def open_store(store_path=STORE_PATH):
+    return ds.dataset(store_path, format='parquet', partitioning='hive')
+
+def write_partitions(table, store_path):
+    ds.write_dataset(
+        table, store_path, format='parquet',
+        partitioning=[PARTITION_COLUMN], partitioning_flavor='hive',
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+def write_shot_store(df, store_path=STORE_PATH):
+    """Rewrite the whole store from a shots frame, swapping it in atomically"""
+    tmp_path = f"{store_path}.tmp"
+    old_path = f"{store_path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    write_partitions(to_shot_table(df), tmp_path)
+
+    if os.path.exists(store_path):
+        os.replace(store_path, old_path)
+    os.replace(tmp_path, store_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def append_shot_store(df, store_path=STORE_PATH):
+    """Add new shots as extra files in their round partitions"""
+    if not store_exists(store_path):
+        write_shot_store(df, store_path)
+        return
+
+    # Stores written before the fixed schema are converted once
+    dataset = open_store(store_path)
+    if set(dataset.schema.names) != set(SHOT_SCHEMA.names):
+        write_shot_store(pd.concat([to_frame(dataset), df], ignore_index=True), store_path)
+        return
+
+    table = to_shot_table(df)
+
+    # Write next to the store first and move finished files in, so readers never see a partial file
+    tmp_path = f"{store_path}.append"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    write_partitions(table, tmp_path)
+    for root, _, files in os.walk(tmp_path):
+        partition = os.path.join(store_path, os.path.relpath(root, tmp_path))
+        os.makedirs(partition, exist_ok=True)
+        for filename in files:
+            os.replace(os.path.join(root, filename), os.path.join(partition, filename))
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+def to_frame(dataset, columns=None):
+    df = dataset.to_table(columns=columns).to_pandas()
+    # Hand the Arrow buffers back to the OS, only the pandas copy is kept
+    pa.default_memory_pool().release_unused()
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype(int)
+    return df
+
+def read_shot_store(columns=None, store_path=STORE_PATH):
+    """Read only the requested columns from the store"""
+    return to_frame(open_store(store_path), columns)
+
+def read_shots_incremental(columns=None, store_path=STORE_PATH, csv_path=CSV_PATH):
+    """Like read_shots, but only reads the part files added since the previous call"""
+    if not store_exists(store_path):
+        return read_shots(columns, store_path, csv_path)
+
+    key = (store_path, tuple(columns) if columns else None)
+    with _loaded_lock:
+        dataset = open_store(store_path)
+        files = set(dataset.files)
+        loaded_files, df = _loaded.get(key, (set(), None))
+
+        if df is None or not loaded_files <= files:
+            # First load, or the store was rewritten: read everything
+            df = to_frame(dataset, columns)
+        elif files - loaded_files:
+            new_files = ds.dataset(sorted(files - loaded_files), format='parquet',
+                                   partitioning='hive', partition_base_dir=store_path)
+            df = concat_shots([df, to_frame(new_files, columns)])
+
+        _loaded[key] = (files, df)
+        return df
+
+def read_shots(columns=None, store_path=STORE_PATH, csv_path=CSV_PATH):
+    """Read shots from the columnar store, falling back to the CSV if it was not built yet"""
+    if store_exists(store_path):
+        return read_shot_store(columns, store_path)
+    df = apply_shot_schema(pd.read_csv(csv_path, usecols=source_columns(columns)))
+    return df[columns] if columns else df
+
+def make_synthetic(df, scale):
+    """Repeat the shots frame scale times with distinct shot ids"""
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        copy['id'] = copy['id'] + i * 10 ** 10
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+def measure_load(kind, path, columns):
+    """Cold load in this process: seconds and resident memory growth in MB"""
+    before = current_rss_mb()
+    start = time.perf_counter()
+    if kind == 'csv':
+        df = pd.read_csv(path, usecols=columns)
+    else:
+        df = read_shot_store(columns, path)
+    elapsed = time.perf_counter() - start
+    return {'rows': len(df), 'seconds': elapsed, 'rss_mb': current_rss_mb() - before}
+
+def run_benchmark(csv_path=CSV_PATH, scales=(1, 10, 100), columns=None):
+    """Compare cold load time and memory of the CSV and the store at several data sizes"""
+    base = pd.read_csv(csv_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            df = make_synthetic(base, scale)
+            scale_csv = os.path.join(tmp, f"shots_{scale}.csv")
+            scale_store = os.path.join(tmp, f"shots_{scale}.parquet")
+            df.to_csv(scale_csv, index=False)
+            write_shot_store(df, scale_store)
+            del df
+
+            for kind, path in [('csv', scale_csv), ('parquet', scale_store)]:
+                # Fresh interpreter per load so nothing is warm
+                cmd = [sys.executable, os.path.abspath(__file__), '_load', kind, path]
+                if columns:
+                    cmd += ['--columns', ','.join(columns)]
+                result = json.loads(subprocess.check_output(cmd, cwd=os.path.dirname(os.path.abspath(__file__))))
+                print(f"{scale:>4}x {kind:>8}: {result['rows']:>8} rows, "
+                      f"{result['seconds'] * 1000:8.1f} ms, +{result['rss_mb']:7.1f} MB RSS")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar shot store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Rebuild the store from the consolidated CSV")
+    build.add_argument('--csv', default=CSV_PATH)
+    build.add_argument('--store', default=STORE_PATH)
+    bench = commands.add_parser('bench', help="Benchmark cold loads against the CSV at 1x/10x/100x")
+    bench.add_argument('--csv', default=CSV_PATH)
+    bench.add_argument('--columns', help="Comma separated columns to load (default: all)")
+    load = commands.add_parser('_load')
+    load.add_argument('kind')
+    load.add_argument('path')
+    load.add_argument('--columns')
+    args = parser.parse_args()
+
+    columns = args.columns.split(',') if getattr(args, 'columns', None) else None
+    if args.command == 'build':
+        write_shot_store(pd.read_csv(args.csv), args.store)
+        print(f"Wrote {args.store}")
+    elif args.command == 'bench':
+        run_benchmark(args.csv, columns=columns)
+    else:
+        print(json.dumps(measure_load(args.kind, args.path, columns)))
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEAM_ALIASES_FILE = os.path.join(BASE_DIR, 'team_aliases.json')
+LOGOS_FOLDER = os.path.join(BASE_DIR, 'logos')
+
+@lru_cache(maxsize=None)
+def normalize_team_name(name):
+    """Normalize team name by removing accents and standardizing format"""
+    # Convert to lowercase
+    name = name.lower()
+    # Remove accents
+    name = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore').decode('utf-8')
+    # Remove non-alphanumeric characters and standardize spaces
+    name = re.sub(r'[^\w\s]', '', name)
+    name = re.sub(r'\s+', ' ', name).strip()
+    return name
+
+class TeamRegistry:
+    """Normalized alias -> canonical team index, shared by the scraper and the pages"""
+
+    def __init__(self, team_aliases, logos_folder=LOGOS_FOLDER):
+        self.logos_folder = logos_folder
+
+        # Every normalized name or alias points to the normalized canonical name
+        self.index = {}
+        for team_name, aliases in team_aliases.items():
+            canonical = normalize_team_name(team_name)
+            self.index[canonical] = canonical
+            for alias in aliases:
+                self.index[normalize_team_name(alias)] = canonical
+
+        # Logo files are named after any of the team's names
+        self.logos = {}
+        if os.path.isdir(logos_folder):
+            for filename in sorted(os.listdir(logos_folder)):
+                name, ext = os.path.splitext(filename)
+                if ext.lower() == '.png':
+                    self.logos.setdefault(self.canonical(name), filename)
+
+    @classmethod
+    def load(cls, path=TEAM_ALIASES_FILE, logos_folder=LOGOS_FOLDER):
+        """Build the registry from the team aliases data file"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), logos_folder)
+
+    def canonical(self, team_name):
+        """Normalized canonical name for any known spelling (unknown names map to themselves)"""
+        norm = normalize_team_name(team_name)
+        return self.index.get(norm, norm)
+
+    def tag_home_away(self, team_names, h_team, a_team):
+        """Vectorized 'h'/'a' tagging of a teamName series ('unknown' for missing names)"""
+        sides = {self.canonical(h_team): 'h', self.canonical(a_team): 'a'}
+        # Resolve each distinct name once, then map the whole column
+        lookup = {name: sides.get(self.canonical(name)) for name in team_names.dropna().unique()}
+        return team_names.map(lookup).where(team_names.notna(), 'unknown')
+
+    def logo_filename(self, team_name):
+        """Logo filename in the logos folder for a team, or None if there is none"""
+        return self.logos.get(self.canonical(team_name))
+
+    def logo_path(self, team_name):
+        """Full path of the team logo, or None if there is none"""
+        filename = self.logo_filename(team_name)
+        return os.path.join(self.logos_folder, filename) if filename else None
+
+@lru_cache(maxsize=None)
+def get_team_registry(path=TEAM_ALIASES_FILE, logos_folder=LOGOS_FOLDER):
+    """Process-wide registry, loaded once"""
+    return TeamRegistry.load(path, logos_folder)
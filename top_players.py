@@ -0,0 +1,73 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+TABLE_COLUMNS = ['Name', 'Team', 'Shots', 'xG']
+
+class TopPlayers:
+    """Player rankings by shots for every (shot type, team), built from one groupby per data version"""
+
+    def __init__(self, df):
+        # One row per (team, player, on target): shot count, xG sum and number of shots with an xG
+        cube = df.groupby(['teamName', 'playerName', 'isOnTarget'], observed=True)['expectedGoals'].agg(
+            shots='size', xg_sum='sum', xg_count='count'
+        ).reset_index()
+
+        # (shot_type, team) -> ranking table, team None is the whole competition
+        self.rankings = {}
+        for shot_type in ('all', 'target'):
+            rows = cube[cube['isOnTarget']] if shot_type == 'target' else cube
+            players = rows.groupby(['playerName', 'teamName'], observed=True)[['shots', 'xg_sum', 'xg_count']].sum()
+            players = players.reset_index().sort_values(['shots', 'playerName'], ascending=[False, True],
+                                                        kind='stable')
+            table = pd.DataFrame({
+                'Name': players['playerName'].astype(str),
+                'Team': players['teamName'].astype(str),
+                'Shots': players['shots'],
+                'xG': (players['xg_sum'] / players['xg_count']).map(lambda x: f'{x:.2f}'),
+            }).reset_index(drop=True)
+
+            self.rankings[(shot_type, None)] = table
+            for team, team_table in table.groupby('Team', sort=False):
+                self.rankings[(shot_type, team)] = team_table.reset_index(drop=True)
+
+    def top(self, shot_type="all", team=None, limit=10):
+        """Same shape as Home.prepare_top_players_table"""
+        ranking = self.rankings.get((shot_type, team))
+        if ranking is None:
+            return pd.DataFrame(columns=TABLE_COLUMNS)
+        return ranking.head(limit)
+
+def run_benchmark(csv_path, repeat=100):
+    """Per-rerun cost of the groupby tables vs cube lookups"""
+    df = pd.read_csv(csv_path, usecols=['teamName', 'playerName', 'isOnTarget', 'expectedGoals'])
+    start = time.perf_counter()
+    cube = TopPlayers(df)
+    print(f"Cube built in {(time.perf_counter() - start) * 1000:.1f} ms ({len(cube.rankings)} rankings)")
+
+    team = df['teamName'].iloc[0]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for limit, table_team in [(5, None), (10, team)]:
+            filtered = df[df['teamName'] == table_team] if table_team else df
+            filtered = filtered[filtered['isOnTarget'] == True]
+            result = filtered.groupby(['playerName', 'teamName']).agg(
+                Shots=('playerName', 'size'), xG=('expectedGoals', 'mean')
+            ).reset_index().sort_values('Shots', ascending=False).head(limit)
+            result['xG'] = result['xG'].apply(lambda x: f'{x:.2f}')
+    print(f"groupby tables: {(time.perf_counter() - start) / repeat * 1000:7.3f} ms per rerun")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cube.top('target', limit=5)
+        cube.top('target', team)
+    print(f"cube lookups:   {(time.perf_counter() - start) / repeat * 1000:7.3f} ms per rerun")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the top players cube")
+    parser.add_argument('--csv', default=os.path.join('concat_files', 'concat_shots.csv'))
+    args = parser.parse_args()
+
+    run_benchmark(args.csv)